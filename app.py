@@ -1,103 +1,237 @@
-import streamlit as st
-from streamlit_lottie import st_lottie
-import requests
-
-# Page configuration
-st.set_page_config(
-    page_title="All in One Retail Management",
-    layout="wide"
-)
-
-# Load Lottie animations
-def load_lottieurl(url):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
-
-inventory_lottie = load_lottieurl("https://assets10.lottiefiles.com/packages/lf20_jcikwtux.json")
-retail_lottie = load_lottieurl("https://assets10.lottiefiles.com/packages/lf20_9cyyl8i4.json")  # Retail management
-
-# --- Custom Background and CSS ---
-st.markdown("""
-    <style>
-        .stApp {
-            background: linear-gradient(to right, #141e30, #243b55);
-            color: white;
-        }
-        h1, h2, h3, .stMarkdown p {
-            color: #f0f0f0;
-        }
-        .nav-bar {
-            display: flex;
-            justify-content: center;
-            gap: 2rem;
-            margin-bottom: 20px;
-        }
-        .nav-item {
-            font-size: 18px;
-            padding: 8px 20px;
-            background-color: #1f2937;
-            border-radius: 10px;
-            color: white;
-            text-decoration: none;
-        }
-        .nav-item:hover {
-            background-color: #3b82f6;
-            cursor: pointer;
-        }
-        img {
-            border-radius: 12px;
-        }
-    </style>
-""", unsafe_allow_html=True)
-
-
-# --- Title Section ---
-st.markdown("<h1 style='text-align:center;'> All in One Retail Management</h1>", unsafe_allow_html=True)
-st.markdown("<p style='text-align:center; font-size:18px;'>Empowering retailers with real-time insights .</p>", unsafe_allow_html=True)
-st.markdown("<hr>", unsafe_allow_html=True)
-
-# --- Main Layout ---
-left_col, right_col = st.columns([1.2, 1])
-
-with left_col:
-    st.subheader(" Features:")
-    st.markdown("""
-    - 📋 Inventory: Track stock levels, product variations, and categories.
-    - 📈 Sales: View product performance, trends, and orders.
-    - 📥 Purchases: Manage vendor performance and payment schedules.
-    """)
-
-    st.subheader("Get Started:")
-    st.markdown("""
-    1. Go to the Upload or Add Data page.
-    2. Explore dashboards through the sidebar.
-    3. Monitor trends, alerts, and inventory health — all in one place!
-    """)
-
-    st.subheader("⚙ Built With:")
-    st.markdown("-  Python + Streamlit\n- 🛢 MySQL\n-  Realtime Dashboards")
-
-    st.markdown("###  Quick Navigation:")
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("📤 Upload Data"):
-            st.switch_page("pages/0_upload_data.py")
-    with col2:
-        if st.button("📊 View Inventory"):
-            st.switch_page("pages/1_Home.py")
-
-with right_col:
-    st_lottie(inventory_lottie, height=250, key="inventory_anim")
-    st_lottie(retail_lottie, height=250, key="retail_anim")
-
-
-# --- Footer ---
-st.markdown("<hr>", unsafe_allow_html=True)
-st.markdown("""
-<div style='text-align:center;'>
-    🔒 Secure | ⚡ Fast | 🎯 Accurate<br>
-    <span style='font-size:12px;'>Built by Sakshi Saraiya & Chirag Thakkar</span>
-</div>
-""", unsafe_allow_html=True)
+import time
+
+# Taken before any other import so the startup budget covers import time
+SCRIPT_STARTED = time.perf_counter()
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import streamlit as st
+import perf
+
+# Page configuration
+st.set_page_config(
+    page_title="All in One Retail Management",
+    layout="wide"
+)
+timer = perf.page_timer("Landing", started=SCRIPT_STARTED)
+
+# --- Lottie animations ---
+# Served from disk so the landing page never waits on the CDN. A background
+# thread keeps refreshed copies in .cache/lottie (never the git-tracked
+# files) with a hard timeout; the bundled assets/lottie files are the
+# fallback, so an air-gapped host still shows them.
+LOTTIE_URLS = {
+    "inventory": "https://assets10.lottiefiles.com/packages/lf20_jcikwtux.json",
+    "retail": "https://assets10.lottiefiles.com/packages/lf20_9cyyl8i4.json",  # Retail management
+}
+LOTTIE_DIR = Path(__file__).parent / "assets" / "lottie"
+LOTTIE_CACHE_DIR = Path(__file__).parent / ".cache" / "lottie"
+
+# Landing page script time, imports included, allowed before the run is
+# flagged over budget (enforced by tests/test_app.py)
+STARTUP_BUDGET_MS = 300
+
+
+def _asset_settings():
+    try:
+        assets = st.secrets.get("assets", {})
+    except FileNotFoundError:
+        assets = {}
+    return {
+        "refresh": assets.get("refresh", True),
+        "timeout": float(assets.get("timeout", 3)),
+        "max_age_hours": float(assets.get("max_age_hours", 24 * 7)),
+    }
+
+
+def load_lottie(name):
+    for folder in (LOTTIE_CACHE_DIR, LOTTIE_DIR):
+        try:
+            with open(folder / f"{name}.json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def _refresh_lottie(timeout, max_age_hours):
+    # requests is only needed here, so it stays off the page's import path
+    import requests
+
+    LOTTIE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for name, url in LOTTIE_URLS.items():
+        path = LOTTIE_CACHE_DIR / f"{name}.json"
+        if path.exists() and time.time() - path.stat().st_mtime < max_age_hours * 3600:
+            continue
+        try:
+            r = requests.get(url, timeout=timeout)
+            if r.status_code != 200:
+                continue
+            r.json()
+        except Exception:
+            continue
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(r.content)
+        os.replace(tmp_path, path)
+
+
+# ✅ Started once per server process, never on the script's critical path
+@st.cache_resource
+def start_lottie_refresh():
+    settings = _asset_settings()
+    if not settings["refresh"]:
+        return None
+    thread = threading.Thread(
+        target=_refresh_lottie,
+        args=(settings["timeout"], settings["max_age_hours"]),
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+# ✅ st_lottie is a custom component: its module pulls in requests, and the
+# first call imports pyarrow and pandas (~0.7 s on a cold process). They are
+# imported in the background instead, and the page shows a placeholder
+# until the player is ready. The warm-up starts after the first run has
+# finished so it doesn't compete with it for the GIL.
+@st.cache_resource
+def lottie_player_ready():
+    return threading.Event()
+
+
+def _warm_lottie_player(ready):
+    import pandas  # noqa: F401
+    import pyarrow  # noqa: F401
+    import streamlit_lottie  # noqa: F401
+    ready.set()
+
+
+@st.cache_resource
+def start_lottie_warmup():
+    thread = threading.Thread(target=_warm_lottie_player, args=(lottie_player_ready(),), daemon=True)
+    thread.start()
+    return thread
+
+
+def show_animations(inventory_lottie, retail_lottie):
+    if inventory_lottie or retail_lottie:
+        from streamlit_lottie import st_lottie
+
+    if inventory_lottie:
+        st_lottie(inventory_lottie, height=250, key="inventory_anim")
+    if retail_lottie:
+        st_lottie(retail_lottie, height=250, key="retail_anim")
+
+
+def show_placeholder():
+    st.markdown("<p style='text-align:center; font-size:120px;'>📦🛒</p>", unsafe_allow_html=True)
+
+
+@st.fragment(run_every=0.5)
+def wait_for_player():
+    # Only this fragment reruns while waiting; once the player is warm the
+    # whole page reruns and renders the animations.
+    if lottie_player_ready().is_set():
+        st.rerun()
+    show_placeholder()
+
+
+perf.panel_toggle()
+start_lottie_refresh()
+inventory_lottie = load_lottie("inventory")
+retail_lottie = load_lottie("retail")
+
+# --- Custom Background and CSS ---
+st.markdown("""
+    <style>
+        .stApp {
+            background: linear-gradient(to right, #141e30, #243b55);
+            color: white;
+        }
+        h1, h2, h3, .stMarkdown p {
+            color: #f0f0f0;
+        }
+        .nav-bar {
+            display: flex;
+            justify-content: center;
+            gap: 2rem;
+            margin-bottom: 20px;
+        }
+        .nav-item {
+            font-size: 18px;
+            padding: 8px 20px;
+            background-color: #1f2937;
+            border-radius: 10px;
+            color: white;
+            text-decoration: none;
+        }
+        .nav-item:hover {
+            background-color: #3b82f6;
+            cursor: pointer;
+        }
+        img {
+            border-radius: 12px;
+        }
+    </style>
+""", unsafe_allow_html=True)
+
+
+# --- Title Section ---
+st.markdown("<h1 style='text-align:center;'> All in One Retail Management</h1>", unsafe_allow_html=True)
+st.markdown("<p style='text-align:center; font-size:18px;'>Empowering retailers with real-time insights .</p>", unsafe_allow_html=True)
+st.markdown("<hr>", unsafe_allow_html=True)
+
+# --- Main Layout ---
+left_col, right_col = st.columns([1.2, 1])
+
+with left_col:
+    st.subheader(" Features:")
+    st.markdown("""
+    - 📋 Inventory: Track stock levels, product variations, and categories.
+    - 📈 Sales: View product performance, trends, and orders.
+    - 📥 Purchases: Manage vendor performance and payment schedules.
+    """)
+
+    st.subheader("Get Started:")
+    st.markdown("""
+    1. Go to the Upload or Add Data page.
+    2. Explore dashboards through the sidebar.
+    3. Monitor trends, alerts, and inventory health — all in one place!
+    """)
+
+    st.subheader("⚙ Built With:")
+    st.markdown("-  Python + Streamlit\n- 🛢 MySQL\n-  Realtime Dashboards")
+
+    st.markdown("###  Quick Navigation:")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("📤 Upload Data"):
+            st.switch_page("pages/0_upload_data.py")
+    with col2:
+        if st.button("📊 View Inventory"):
+            st.switch_page("pages/1_Home.py")
+
+with right_col:
+    if not (inventory_lottie or retail_lottie):
+        show_placeholder()
+    elif lottie_player_ready().is_set():
+        show_animations(inventory_lottie, retail_lottie)
+    else:
+        wait_for_player()
+
+
+# --- Footer ---
+st.markdown("<hr>", unsafe_allow_html=True)
+st.markdown("""
+<div style='text-align:center;'>
+    🔒 Secure | ⚡ Fast | 🎯 Accurate<br>
+    <span style='font-size:12px;'>Built by Sakshi Saraiya & Chirag Thakkar</span>
+</div>
+""", unsafe_allow_html=True)
+
+perf.finish_page(timer, budget_ms=STARTUP_BUDGET_MS)
+start_lottie_warmup()
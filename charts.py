@@ -0,0 +1,38 @@
+import pandas as pd
+import streamlit as st
+
+# Figures are reused until the filters or the data change: pages put a data
+# version (frame_version, delta_sync.table_version) in `state`, uploads clear
+# st.cache_data (db_connector.mark_written) and the TTL only evicts.
+CACHE_TTL = 300
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=200)
+def _cached_figure(name, state, _build):
+    return _build()
+
+
+def figure(name, state, build):
+    """The figure returned by `build()`, memoized on (name, state).
+
+    `state` is a hashable snapshot of everything the figure depends on
+    (filters, sliders). `build` does the aggregation and the Plotly call and
+    only runs on a cache miss. Include a data version in `state` so a
+    write by another session is picked up on the next rerun.
+    """
+    return _cached_figure(name, state, build)
+
+
+def frame_version(*frames):
+    # Row count and summed row hashes of frames the page already fetched;
+    # about 20 ms per 100k rows, far less than rebuilding the figures.
+    return tuple(
+        (len(frame), int(pd.util.hash_pandas_object(frame, index=False).sum()))
+        for frame in frames
+    )
+
+
+def is_open(container):
+    # Tabs/expanders created with on_change="rerun" report whether they are
+    # showing; None means the container doesn't track it, so build anyway.
+    return container.open is not False
@@ -1,27 +1,287 @@
-import streamlit as st
-import pandas as pd
-import mysql.connector
-from sqlalchemy import create_engine
-
-# ✅ mysql.connector — for transactional operations (used by upload_data.py)
-@st.cache_resource
-def get_connection():
-    return mysql.connector.connect(
-        host=st.secrets["mysql"]["host"],
-        user=st.secrets["mysql"]["user"],
-        password=st.secrets["mysql"]["password"],
-        database=st.secrets["mysql"]["database"],
-        port=st.secrets["mysql"]["port"]
-    )
-
-# ✅ SQLAlchemy + pymysql — for analytics (used by pandas.read_sql)
-@st.cache_resource
-def get_engine():
-    return create_engine(
-        f"mysql+pymysql://{st.secrets['mysql']['user']}:{st.secrets['mysql']['password']}@"
-        f"{st.secrets['mysql']['host']}:{st.secrets['mysql']['port']}/{st.secrets['mysql']['database']}"
-    )
-
-def fetch_query(query):
-    engine = get_engine()
-    return pd.read_sql(query, engine)
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+import pandas as pd
+import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import OperationalError
+
+# ✅ mysql.connector — for transactional operations (used by upload_data.py)
+@st.cache_resource
+def get_connection():
+    return mysql.connector.connect(
+        host=st.secrets["mysql"]["host"],
+        user=st.secrets["mysql"]["user"],
+        password=st.secrets["mysql"]["password"],
+        database=st.secrets["mysql"]["database"],
+        port=st.secrets["mysql"]["port"]
+    )
+
+# ✅ Pooled mysql.connector connections — one per upload or grid transaction.
+# The cached connection above is shared by every session and is not
+# thread-safe, so a rollback there could discard another session's rows.
+@st.cache_resource
+def get_connection_pool():
+    config = st.secrets["mysql"]
+    return pooling.MySQLConnectionPool(
+        pool_name="ingest",
+        pool_size=int(config.get("pool_size", 5)),
+        host=config["host"],
+        user=config["user"],
+        password=config["password"],
+        database=config["database"],
+        port=config["port"]
+    )
+
+def _checkout(pool, wait):
+    # get_connection() fails at once when every connection is busy instead of
+    # queueing, so retry with backoff for up to `wait` seconds, then give up
+    # with the PoolError for the page to report.
+    deadline = time.monotonic() + wait
+    delay = 0.05
+    while True:
+        try:
+            return pool.get_connection()
+        except PoolError:
+            if time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+@contextmanager
+def pooled_connection():
+    wait = float(st.secrets["mysql"].get("pool_wait", 10))
+    conn = _checkout(get_connection_pool(), wait)
+    try:
+        yield conn
+    finally:
+        # Returns the connection to the pool; uncommitted work is rolled back
+        conn.close()
+
+# ✅ SQLAlchemy + pymysql — for analytics (used by pandas.read_sql)
+def _make_engine(config):
+    engine = create_engine(URL.create(
+        "mysql+pymysql",
+        username=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config["port"],
+        database=config["database"]
+    ))
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+# Primary: writes and reads that must see them
+@st.cache_resource
+def get_engine():
+    return _make_engine(st.secrets["mysql"])
+
+
+# -------------------------
+# Read replicas
+# -------------------------
+# [mysql] may list replicas; each entry overrides host/port (and optionally
+# user/password/database) of the primary:
+#
+#   [[mysql.replicas]]
+#   host = "replica-1.example.com"
+#   port = 3306
+#
+# Dashboard reads are spread round-robin over the replicas. A replica that
+# fails to connect is skipped for `replica_cooldown` seconds, and reads fall
+# back to the primary when none is available. For `read_your_writes` seconds
+# after a session writes, its reads go to the primary so an upload is
+# visible straight away despite replication lag.
+def _routing_settings():
+    config = st.secrets["mysql"]
+    return {
+        "replica_cooldown": float(config.get("replica_cooldown", 30)),
+        "read_your_writes": float(config.get("read_your_writes", 30)),
+    }
+
+@st.cache_resource
+def get_replica_engines():
+    primary = dict(st.secrets["mysql"])
+    replicas = primary.pop("replicas", [])
+    return [_make_engine({**primary, **dict(replica)}) for replica in replicas]
+
+# ✅ Shared by every session: round-robin position and replicas marked down
+@st.cache_resource
+def _replica_state():
+    return {"lock": threading.Lock(), "next": 0, "down_until": {}}
+
+def mark_written():
+    # Call after the write has committed: the window counts from here, and a
+    # cache refilled mid-write would otherwise keep pre-write data until TTL
+    st.session_state["read_primary_until"] = time.time() + _routing_settings()["read_your_writes"]
+    # Cached dashboard aggregates predate the write
+    st.cache_data.clear()
+
+def _read_engines():
+    # Candidate engines for a read, in the order they should be tried
+    primary = get_engine()
+    if st.session_state.get("read_primary_until", 0) > time.time():
+        return [primary]
+
+    replicas = get_replica_engines()
+    state = _replica_state()
+    with state["lock"]:
+        start = state["next"]
+        state["next"] = (start + 1) % max(len(replicas), 1)
+        now = time.time()
+        healthy = [
+            replicas[(start + offset) % len(replicas)]
+            for offset in range(len(replicas))
+            if state["down_until"].get((start + offset) % len(replicas), 0) <= now
+        ]
+    return healthy + [primary]
+
+def _mark_down(engine):
+    replicas = get_replica_engines()
+    if engine not in replicas:
+        return
+    state = _replica_state()
+    with state["lock"]:
+        state["down_until"][replicas.index(engine)] = time.time() + _routing_settings()["replica_cooldown"]
+
+# Client errors that mean the server couldn't be reached or dropped the
+# connection: can't connect (2002/2003), server gone away (2006), lost
+# connection during query (2013). Anything else is the query's fault.
+CONNECTION_ERRORS = {2002, 2003, 2006, 2013}
+
+def _is_connection_error(error):
+    args = getattr(error.orig, "args", ())
+    return bool(args) and args[0] in CONNECTION_ERRORS
+
+def get_read_engine():
+    return _read_engines()[0]
+
+def fetch_query(query, params=None):
+    engines = _read_engines()
+    for engine in engines[:-1]:
+        try:
+            return pd.read_sql(query, engine, params=params)
+        except OperationalError as error:
+            # Lock wait timeouts, killed queries etc. would fail on the next
+            # engine too; only a dead replica is taken out and skipped.
+            if not _is_connection_error(error):
+                raise
+            _mark_down(engine)
+    return pd.read_sql(query, engines[-1], params=params)
+
+
+# -------------------------
+# Slow-query log
+# -------------------------
+# Every statement is timed; the ones slower than `slow_ms` are kept in a
+# ring buffer of the last `size` entries. Both are read from an optional
+# [query_log] section in secrets.
+def query_log_settings():
+    try:
+        settings = st.secrets.get("query_log", {})
+    except FileNotFoundError:
+        settings = {}
+    return {
+        "slow_ms": float(settings.get("slow_ms", 500)),
+        "size": int(settings.get("size", 100)),
+    }
+
+# ✅ Shared by every session of this server process
+@st.cache_resource
+def get_query_log():
+    return {
+        "lock": threading.Lock(),
+        "entries": deque(maxlen=query_log_settings()["size"]),
+    }
+
+def _explain(engine, statement, params):
+    # Runs on its own pooled connection so it never disturbs a cursor that
+    # is still streaming results.
+    with engine.connect() as conn:
+        if params:
+            params = tuple(params) if isinstance(params, list) else params
+            result = conn.exec_driver_sql(f"EXPLAIN {statement}", params)
+        else:
+            result = conn.exec_driver_sql(f"EXPLAIN {statement}")
+        columns = list(result.keys())
+        return [dict(zip(columns, row)) for row in result.fetchall()]
+
+def record_query(statement, params, seconds, rows, engine=None):
+    if seconds * 1000 < query_log_settings()["slow_ms"]:
+        return
+    entry = {
+        "ts": time.time(),
+        "ms": round(seconds * 1000, 2),
+        "host": (engine or get_engine()).url.host,
+        "statement": " ".join(statement.split()),
+        "params": params,
+        "rows": rows,
+        "explain": None,
+    }
+    if statement.lstrip().upper().startswith("SELECT"):
+        try:
+            entry["explain"] = _explain(engine or get_engine(), statement, params)
+        except Exception as e:
+            entry["explain"] = f"EXPLAIN failed: {e}"
+    log = get_query_log()
+    with log["lock"]:
+        log["entries"].append(entry)
+
+def slow_queries():
+    log = get_query_log()
+    with log["lock"]:
+        return list(log["entries"])
+
+def clear_slow_queries():
+    log = get_query_log()
+    with log["lock"]:
+        log["entries"].clear()
+
+def dump_slow_queries(path=None):
+    # default=str covers Decimal / date values in params and EXPLAIN rows
+    dumped = json.dumps(slow_queries(), indent=2, default=str)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(dumped)
+    return dumped
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    if not statement.lstrip().upper().startswith("EXPLAIN"):
+        record_query(statement, parameters, seconds, cursor.rowcount, conn.engine)
+
+
+# ✅ Timed wrapper around a mysql.connector cursor, so writes from the
+# upload page land in the same log as the analytics reads.
+class TimedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, statement, params=None):
+        start = time.perf_counter()
+        result = self._cursor.execute(statement, params)
+        record_query(statement, params, time.perf_counter() - start, self._cursor.rowcount)
+        return result
+
+    def executemany(self, statement, rows):
+        start = time.perf_counter()
+        result = self._cursor.executemany(statement, rows)
+        record_query(statement, f"<{len(rows)} rows>", time.perf_counter() - start, self._cursor.rowcount)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+def timed_cursor(conn):
+    return TimedCursor(conn.cursor())
@@ -0,0 +1,168 @@
+import threading
+import time
+
+import streamlit as st
+import pandas as pd
+from db_connector import fetch_query
+
+# ✅ Tables kept in memory and refreshed incrementally.
+# `key` identifies a row; `append_key` (if any) grows with every insert, so
+# new rows are exactly those above the high-water mark. Changed rows are
+# found through the updated_at column added by init_db.py.
+SYNCED_TABLES = {
+    "sales": {"key": "sale_id", "append_key": "sale_id"},
+    "product": {"key": "product_id", "append_key": None},
+}
+
+# Rows updated this long before the newest updated_at seen are re-read, to
+# cover transactions that commit out of timestamp order or replica lag.
+UPDATED_OVERLAP = pd.Timedelta(seconds=60)
+
+# Reruns within this many seconds of the last sync reuse the cached frame
+MIN_SYNC_INTERVAL = 5
+
+
+# -------------------------
+# Derived aggregates, maintained from deltas instead of recomputed
+# -------------------------
+def _normalize_ids(series):
+    return series.astype(str).str.strip().str.upper()
+
+
+def _sales_by_product(rows):
+    return pd.DataFrame({
+        'product_id': _normalize_ids(rows['product_id']),
+        'quantity_sold': pd.to_numeric(rows['quantity_sold'], errors='coerce').fillna(0),
+        'selling_price_sum': pd.to_numeric(rows['selling_price'], errors='coerce').fillna(0),
+        'sales_count': pd.to_numeric(rows['selling_price'], errors='coerce').notna().astype(int),
+    }).groupby('product_id').sum()
+
+
+# name -> (table, function turning rows into summable per-group totals)
+AGGREGATES = {
+    "sales_by_product": ("sales", _sales_by_product),
+}
+
+
+# -------------------------
+# Shared state
+# -------------------------
+@st.cache_resource
+def _state():
+    return {name: {"lock": threading.Lock(), "frame": None, "synced_at": 0.0, "version": 0}
+            for name in SYNCED_TABLES}
+
+
+@st.cache_resource
+def _aggregates():
+    return {}
+
+
+def _keyed(table, frame):
+    # Index by the key (keeping the column) so deltas replace rows by label
+    frame.index = frame[SYNCED_TABLES[table]["key"]].to_numpy()
+    return frame
+
+
+def _full_load(table):
+    return _keyed(table, fetch_query(f"SELECT * FROM {table}"))
+
+
+def _fetch_delta(table, frame):
+    spec = SYNCED_TABLES[table]
+    clauses, params = [], []
+    if spec["append_key"] and not frame.empty:
+        high_water = frame[spec["append_key"]].max()
+        clauses.append(f"{spec['append_key']} > %s")
+        params.append(high_water.item() if hasattr(high_water, "item") else high_water)
+    if "updated_at" in frame.columns and frame["updated_at"].notna().any():
+        since = pd.Timestamp(frame["updated_at"].max()) - UPDATED_OVERLAP
+        clauses.append("updated_at >= %s")
+        params.append(since.to_pydatetime())
+    if not clauses:
+        # Nothing to anchor a delta on (empty table or no updated_at): reload
+        return None
+    delta = fetch_query(f"SELECT * FROM {table} WHERE {' OR '.join(clauses)}", tuple(params))
+    return _keyed(table, delta)
+
+
+def _apply_aggregates(table, removed, added):
+    aggregates = _aggregates()
+    for name, (source, build) in AGGREGATES.items():
+        if source != table or name not in aggregates:
+            continue
+        current = aggregates[name]
+        if not removed.empty:
+            current = current.sub(build(removed), fill_value=0)
+        if not added.empty:
+            current = current.add(build(added), fill_value=0)
+        aggregates[name] = current
+
+
+def _sync(table, state):
+    # Caller holds state["lock"]
+    just_wrote = st.session_state.get("read_primary_until", 0) > time.time()
+    if (state["frame"] is not None and not just_wrote
+            and time.time() - state["synced_at"] < MIN_SYNC_INTERVAL):
+        return
+
+    frame = state["frame"]
+    delta = None if frame is None else _fetch_delta(table, frame)
+    if delta is None:
+        loaded = _full_load(table)
+        for name, (source, build) in AGGREGATES.items():
+            if source == table:
+                _aggregates()[name] = build(loaded)
+        if frame is None or not loaded.equals(frame):
+            state["version"] += 1
+        frame = loaded
+    elif not delta.empty:
+        changed = delta.index.isin(frame.index)
+        stored = frame.loc[delta.index[changed], delta.columns]
+        # The updated_at overlap re-fetches rows already held; only a real
+        # difference counts as a new version of the table.
+        if not changed.all() or not stored.equals(delta[changed]):
+            state["version"] += 1
+        _apply_aggregates(table, stored, delta)
+        # Overwrite changed rows where they are, then append the new ones
+        frame.loc[delta.index[changed], delta.columns] = delta[changed]
+        if not changed.all():
+            frame = pd.concat([frame, delta[~changed]])
+
+    state["frame"], state["synced_at"] = frame, time.time()
+
+
+def sync(table):
+    """Bring the cached copy of `table` up to date.
+
+    The first call loads the table; later calls fetch only rows above the
+    high-water mark or updated since the last seen updated_at, overwrite the
+    changed rows, append the new ones and adjust the derived aggregates by
+    the difference. A session that just uploaded (see
+    db_connector.mark_written) always syncs.
+    """
+    state = _state()[table]
+    with state["lock"]:
+        _sync(table, state)
+
+
+def load_table(table, columns=None):
+    """A private copy of the synced table, restricted to `columns`."""
+    state = _state()[table]
+    with state["lock"]:
+        _sync(table, state)
+        frame = state["frame"]
+        if columns is None:
+            columns = [col for col in frame.columns if col != "updated_at"]
+        return frame[columns].reset_index(drop=True)
+
+
+def table_version(table):
+    """A number that changes whenever a sync changed the cached `table`."""
+    return _state()[table]["version"]
+
+
+def load_aggregate(name):
+    table, _ = AGGREGATES[name]
+    sync(table)
+    return _aggregates()[name].reset_index()
@@ -0,0 +1,272 @@
+import shutil
+import time
+import uuid
+from importlib.util import find_spec
+from pathlib import Path
+
+import streamlit as st
+import pandas as pd
+from openpyxl import Workbook
+from pymysql.constants import FIELD_TYPE
+
+from db_connector import get_read_engine
+
+# Rows pulled from the server-side cursor per chunk
+CHUNK_SIZE = 20_000
+
+# Excel's hard limit per worksheet, header row included
+XLSX_MAX_ROWS = 1_048_576
+
+FORMATS = ["CSV", "XLSX"] + (["Parquet"] if find_spec("pyarrow") else [])
+
+# Finished exports are written under ./static, which Streamlit serves from
+# disk in chunks (server.enableStaticServing in .streamlit/config.toml).
+EXPORT_DIR = Path(__file__).parent / "static" / "exports"
+EXPORT_URL = "app/static/exports"
+
+# Exports older than this are deleted when the next one is prepared
+EXPORT_TTL = 3600
+
+# Streamlit's static route refuses larger files
+STATIC_MAX_BYTES = 200 * 1024 * 1024
+
+MIME_TYPES = {
+    "CSV": "text/csv",
+    "XLSX": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "Parquet": "application/vnd.apache.parquet",
+}
+
+
+# -------------------------
+# Server-side cursor
+# -------------------------
+def stream_frames(query, params=None, chunk_size=CHUNK_SIZE):
+    """Yield the query result as DataFrames of at most `chunk_size` rows.
+
+    stream_results makes pymysql use an unbuffered SSCursor, so rows are
+    pulled from MySQL as they are consumed instead of all at once.
+    """
+    with get_read_engine().connect().execution_options(stream_results=True, max_row_buffer=chunk_size) as conn:
+        result = conn.exec_driver_sql(query, params) if params else conn.exec_driver_sql(query)
+        columns = list(result.keys())
+        # MySQL column types, so writers don't have to infer them per chunk
+        column_types = {desc[0]: desc[1] for desc in result.cursor.description}
+        for rows in result.partitions(chunk_size):
+            frame = pd.DataFrame(rows, columns=columns)
+            frame.attrs["column_types"] = column_types
+            yield frame
+
+
+# -------------------------
+# Chunked writers — each writes every chunk straight to `path`
+# -------------------------
+def _write_csv(frames, path):
+    header = True
+    for frame in frames:
+        frame.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+    if header:
+        open(path, "w").close()
+
+
+def _write_xlsx(frames, path):
+    # write_only workbooks stream rows to disk instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows = None, XLSX_MAX_ROWS
+    for frame in frames:
+        values = frame.astype(object).where(frame.notna(), None).values.tolist()
+        for row in values:
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+                sheet.append(list(frame.columns))
+                sheet_rows = 1
+            sheet.append(row)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet("Sheet1")
+    workbook.save(path)
+
+
+FLOAT_TYPES = {FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL, FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE}
+INT_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG,
+             FIELD_TYPE.INT24, FIELD_TYPE.YEAR}
+DATE_TYPES = {FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE}
+DATETIME_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+
+
+def _arrow_schema(frame):
+    # Built from the MySQL column types rather than the first chunk, whose
+    # DECIMAL precision or all-NULL columns say nothing about later chunks.
+    # DECIMAL becomes float64 as it does in the dashboards.
+    import pyarrow as pa
+
+    column_types = frame.attrs.get("column_types", {})
+    fields = []
+    for column in frame.columns:
+        type_code = column_types.get(column)
+        if type_code in FLOAT_TYPES:
+            arrow_type = pa.float64()
+        elif type_code in INT_TYPES:
+            arrow_type = pa.int64()
+        elif type_code in DATE_TYPES:
+            arrow_type = pa.date32()
+        elif type_code in DATETIME_TYPES:
+            arrow_type = pa.timestamp("us")
+        elif type_code is None:
+            arrow_type = pa.Table.from_pandas(frame[[column]], preserve_index=False).schema[0].type
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+def _write_parquet(frames, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for frame in frames:
+            if writer is None:
+                writer = pq.ParquetWriter(path, _arrow_schema(frame), compression="snappy")
+            # Decimal objects only convert to Arrow doubles once they are floats
+            for field in writer.schema:
+                if pa.types.is_floating(field.type):
+                    frame[field.name] = frame[field.name].astype(float)
+            table = pa.Table.from_pandas(frame, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {
+    "CSV": (_write_csv, ".csv"),
+    "XLSX": (_write_xlsx, ".xlsx"),
+    "Parquet": (_write_parquet, ".parquet"),
+}
+
+
+def _remove_stale_exports():
+    cutoff = time.time() - EXPORT_TTL
+    for folder in EXPORT_DIR.glob("*"):
+        if folder.stat().st_mtime < cutoff:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def export_query(query, params, fmt, name="export"):
+    """Stream a query into a CSV / XLSX / Parquet file under EXPORT_DIR; returns its path.
+
+    Each export gets a folder with a random name, so its URL can't be guessed.
+    """
+    writer, suffix = WRITERS[fmt]
+    _remove_stale_exports()
+    folder = EXPORT_DIR / uuid.uuid4().hex
+    folder.mkdir(parents=True)
+    path = folder / f"{name}{suffix}"
+    writer(stream_frames(query, params), str(path))
+    return path
+
+
+# -------------------------
+# Dashboard filters -> SQL
+# -------------------------
+def _in_clause(column, selected, options):
+    # Everything selected: match any non-NULL value, like Series.isin() does
+    if set(selected) >= set(options):
+        return f"{column} IS NOT NULL", []
+    if not selected:
+        return "FALSE", []
+    return f"{column} IN ({', '.join(['%s'] * len(selected))})", list(selected)
+
+
+def _where(clauses):
+    sql = " AND ".join(clause for clause, _ in clauses)
+    params = [param for _, clause_params in clauses for param in clause_params]
+    return sql, tuple(params)
+
+
+def sales_export_query(products, all_products, shipped, payment, start_date, end_date):
+    # Mirrors pages/4_Sales.py: name from product, falling back to purchases,
+    # and one row per matching purchase line as the on-screen table shows.
+    clauses = [
+        _in_clause("COALESCE(p.product_name, pu.product_name)", products, all_products),
+        ("s.sales_date BETWEEN %s AND %s", [start_date, end_date]),
+    ]
+    if shipped != "All":
+        clauses.append(("s.shipped_status = %s", [shipped]))
+    if payment != "All":
+        clauses.append(("s.payment_status = %s", [payment]))
+    where, params = _where(clauses)
+    return f"""
+        SELECT s.sale_id, s.sales_date,
+            COALESCE(p.product_name, pu.product_name) AS product_name,
+            s.quantity_sold,
+            s.quantity_sold * s.selling_price AS revenue,
+            s.quantity_sold * (s.selling_price - pu.cost_price) AS profit,
+            s.shipped_status, s.payment_status
+        FROM sales s
+        LEFT JOIN product p ON p.product_id = s.product_id
+        LEFT JOIN purchases pu ON pu.product_id = s.product_id
+        WHERE {where}
+    """, params
+
+
+def purchases_filter(products, all_products, vendors, all_vendors,
+                     statuses, all_statuses, start_date, end_date):
+    # The Purchases sidebar as a WHERE clause; payables.py reuses it so the
+    # alerts cover the same lines as the table and the export.
+    return _where([
+        _in_clause("product_name", products, all_products),
+        _in_clause("vendor_name", vendors, all_vendors),
+        _in_clause("payment_status", statuses, all_statuses),
+        ("order_date BETWEEN %s AND %s", [start_date, end_date]),
+    ])
+
+
+def purchases_export_query(*filters):
+    where, params = purchases_filter(*filters)
+    return f"""
+        SELECT product_id, product_name, category, vendor_name,
+            quantity_purchased, cost_price, order_date, payment_due_date, payment_status
+        FROM purchases
+        WHERE {where}
+    """, params
+
+
+# -------------------------
+# Export widget shared by the dashboards
+# -------------------------
+def export_panel(name, query, params):
+    st.markdown("### ⬇️ Export Filtered Data")
+    col1, col2 = st.columns([1, 3])
+    fmt = col1.selectbox("Format", FORMATS, key=f"{name}_export_format")
+    col2.caption("Rows are streamed from MySQL in chunks straight to the file, "
+                 "so even a full year of transactions exports in constant memory.")
+    # The finished export is kept in session_state so later reruns still
+    # show its link, until the filters or the format change.
+    state_key = f"{name}_export"
+    request = (query, params, fmt)
+    if st.button("Prepare Export", key=f"{name}_export_prepare"):
+        with st.spinner("Exporting..."):
+            st.session_state[state_key] = {"request": request, "path": export_query(query, params, fmt, name)}
+
+    export = st.session_state.get(state_key)
+    if export is None or export["request"] != request or not export["path"].exists():
+        return
+
+    path = export["path"]
+    if path.stat().st_size <= STATIC_MAX_BYTES:
+        # Served straight from disk, so the file never sits in memory
+        url = f"{EXPORT_URL}/{path.parent.name}/{path.name}"
+        st.markdown(f'<a href="{url}" download="{path.name}">⬇️ Download {fmt}</a>', unsafe_allow_html=True)
+    else:
+        # Too large for the static route: read only when the user clicks
+        st.download_button(
+            f"⬇️ Download {fmt}",
+            path.read_bytes,
+            file_name=path.name,
+            mime=MIME_TYPES[fmt],
+            key=f"{name}_export_download",
+            on_click="ignore"
+        )
@@ -0,0 +1,149 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Days of history fed to the models and days held out to pick a model per SKU
+HISTORY_DAYS = 91
+HOLDOUT_DAYS = 7
+SEASON = 7
+
+
+# -------------------------
+# Product x day demand matrix
+# -------------------------
+def demand_matrix(sales, days=HISTORY_DAYS, end=None):
+    """Daily units sold per product as a dense (products x days) matrix.
+
+    `sales` needs product_id, quantity_sold and sales_date. The matrix is
+    filled with one np.bincount over flat (product, day) indices, so the cost
+    is linear in the number of sales rows. Returns (product_ids, matrix, start).
+    """
+    dates = pd.to_datetime(sales['sales_date'], errors='coerce').dt.normalize()
+    end = dates.max() if end is None else pd.Timestamp(end).normalize()
+    if pd.isna(end):
+        return pd.Index([]), np.zeros((0, days)), None
+    start = end - pd.Timedelta(days=days - 1)
+
+    codes, product_ids = pd.factorize(sales['product_id'])
+    day = (dates - start).dt.days.to_numpy()
+    keep = (codes >= 0) & (day >= 0) & (day < days)
+
+    flat = codes[keep] * days + day[keep].astype(np.int64)
+    quantity = pd.to_numeric(sales['quantity_sold'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    matrix = np.bincount(flat, weights=quantity[keep], minlength=len(product_ids) * days)
+    return pd.Index(product_ids), matrix.reshape(len(product_ids), days), start
+
+
+# -------------------------
+# Models — each returns a (products x horizon) daily forecast
+# -------------------------
+def exponential_smoothing(matrix, horizon, alpha=0.3):
+    # The recursion runs over days; every step updates all SKUs at once
+    level = matrix[:, 0].copy()
+    for t in range(1, matrix.shape[1]):
+        level = alpha * matrix[:, t] + (1 - alpha) * level
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def seasonal_moving_average(matrix, horizon, window=28, season=SEASON):
+    days = matrix.shape[1]
+    base = matrix[:, -min(window, days):].mean(axis=1)
+
+    # Day-of-cycle index from whole seasons only, aligned to the last day
+    seasons = days // season
+    if seasons == 0:
+        return np.repeat(base[:, None], horizon, axis=1)
+    cycles = matrix[:, days - seasons * season:].reshape(len(matrix), seasons, season).mean(axis=1)
+    mean = cycles.mean(axis=1, keepdims=True)
+    index = np.divide(cycles, mean, out=np.ones_like(cycles), where=mean > 0)
+
+    positions = np.arange(horizon) % season
+    return base[:, None] * index[:, positions]
+
+
+MODELS = {
+    "exponential_smoothing": exponential_smoothing,
+    "seasonal_moving_average": seasonal_moving_average,
+}
+
+
+def forecast_demand(matrix, horizon, holdout=HOLDOUT_DAYS):
+    """Pick the better model per SKU on a holdout window, then refit on all days.
+
+    Returns (forecast, model_names) where forecast is (products x horizon).
+    """
+    names = list(MODELS)
+    if matrix.shape[1] > holdout * 2:
+        train, test = matrix[:, :-holdout], matrix[:, -holdout:]
+        errors = np.stack([
+            np.abs(MODELS[name](train, holdout) - test).mean(axis=1) for name in names
+        ])
+        best = errors.argmin(axis=0)
+    else:
+        best = np.zeros(len(matrix), dtype=int)
+
+    forecasts = np.stack([MODELS[name](matrix, horizon) for name in names])
+    forecast = np.take_along_axis(forecasts, best[None, :, None], axis=0)[0]
+    return forecast, np.asarray(names)[best]
+
+
+# -------------------------
+# Reorder points
+# -------------------------
+PLAN_COLUMNS = [
+    'product_id', 'model', 'daily_forecast', 'lead_time_days', 'lead_time_demand',
+    'safety_stock', 'reorder_point', 'live_stock', 'reorder_now', 'order_quantity',
+]
+
+
+def reorder_plan(sales, stock, lead_time_days=7, review_days=7, service_level=0.95,
+                 history_days=HISTORY_DAYS):
+    """Forecast every SKU and derive reorder points and order quantities.
+
+    `stock` maps product_id -> units on hand (a Series). `lead_time_days` may
+    be a scalar or a Series indexed by product_id. Returns one row per product
+    with its forecast, reorder point and suggested order quantity.
+    """
+    product_ids, matrix, _ = demand_matrix(sales, days=history_days)
+    stock = stock.groupby(level=0).sum()
+    product_ids = product_ids.union(stock.index, sort=False)
+    if len(product_ids) == 0:
+        return pd.DataFrame(columns=PLAN_COLUMNS).astype({'reorder_now': bool})
+    if len(product_ids) > len(matrix):
+        # SKUs with stock but no sales in the window get a zero demand history
+        matrix = np.vstack([matrix, np.zeros((len(product_ids) - len(matrix), matrix.shape[1]))])
+
+    if isinstance(lead_time_days, pd.Series):
+        lead = lead_time_days.reindex(product_ids).fillna(lead_time_days.median()).to_numpy()
+    else:
+        lead = np.full(len(product_ids), float(lead_time_days))
+    lead = np.maximum(np.ceil(lead).astype(int), 1)
+
+    horizon = int(lead.max()) + int(review_days)
+    forecast, model = forecast_demand(matrix, horizon)
+    cumulative = np.cumsum(forecast, axis=1)
+    rows = np.arange(len(product_ids))
+
+    lead_demand = cumulative[rows, lead - 1]
+    cover_demand = cumulative[rows, np.minimum(lead - 1 + int(review_days), horizon - 1)]
+
+    z = NormalDist().inv_cdf(service_level)
+    safety_stock = z * matrix.std(axis=1) * np.sqrt(lead)
+    reorder_point = lead_demand + safety_stock
+
+    on_hand = stock.reindex(product_ids).fillna(0).to_numpy(dtype=float)
+    order_quantity = np.maximum(np.ceil(cover_demand + safety_stock - on_hand), 0)
+
+    return pd.DataFrame({
+        'product_id': product_ids,
+        'model': model,
+        'daily_forecast': forecast[:, 0],
+        'lead_time_days': lead,
+        'lead_time_demand': lead_demand,
+        'safety_stock': safety_stock,
+        'reorder_point': reorder_point,
+        'live_stock': on_hand,
+        'reorder_now': (on_hand <= reorder_point) & (reorder_point > 0),
+        'order_quantity': order_quantity,
+    })
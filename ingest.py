@@ -0,0 +1,453 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from db_connector import timed_cursor
+from partitions import PARTITIONED, UNIQUE_KEYS, key_table
+
+# Rows sent to MySQL per executemany() call
+BATCH_SIZE = 1000
+
+# Rows read from an uploaded file before they are handed to the writer
+CHUNK_SIZE = 50_000
+
+# ✅ Column layout of every table the upload page writes to.
+# `key` is the primary key used for upserts (None = append-only table),
+# `ids` are identifiers read as text so "007" and "1001" survive as written,
+# `required` columns may not be blank, `numeric` columns must parse as
+# non-negative numbers and `dates` must parse as dates.
+TABLES = {
+    "product": {
+        "columns": ["product_id", "product_name", "category", "stock"],
+        "key": "product_id",
+        "ids": ["product_id"],
+        "required": ["product_id", "product_name"],
+        "numeric": ["stock"],
+        "dates": [],
+    },
+    "purchases": {
+        "columns": ["product_id", "product_name", "category", "vendor_name", "order_date",
+                    "quantity_purchased", "cost_price", "payment_due_date", "payment_status"],
+        "key": None,
+        "ids": ["product_id"],
+        "required": ["product_id", "vendor_name", "order_date", "quantity_purchased", "cost_price"],
+        "numeric": ["quantity_purchased", "cost_price"],
+        "dates": ["order_date", "payment_due_date"],
+    },
+    "sales": {
+        "columns": ["sale_id", "product_id", "selling_price", "quantity_sold", "sales_date",
+                    "shipped_status", "payment_status"],
+        "key": "sale_id",
+        "ids": ["product_id"],
+        "required": ["sale_id", "product_id", "selling_price", "quantity_sold", "sales_date"],
+        "numeric": ["sale_id", "selling_price", "quantity_sold"],
+        "dates": ["sales_date"],
+    },
+}
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def _batches(df, batch_size):
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+def _to_rows(df, columns):
+    # NaN -> None so MySQL receives NULL instead of the string 'nan'
+    values = df[columns].astype(object)
+    for col in columns:
+        # mysql.connector cannot convert pandas Timestamps, only datetimes
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            values[col] = pd.Series(df[col].dt.to_pydatetime(), index=df.index, dtype=object)
+    return values.where(values.notna(), None).values.tolist()
+
+
+def _canonical(series, is_date=False):
+    # Normalise values so CSV strings compare equal to typed MySQL values
+    # (e.g. "10.5" vs Decimal('10.50'), "2024-01-05" vs date(2024, 1, 5)).
+    if is_date:
+        dates = pd.to_datetime(series, errors="coerce").dt.strftime("%Y-%m-%d")
+        return dates.where(dates.notna(), "")
+    numeric = pd.to_numeric(series, errors="coerce")
+    text = series.astype(str).str.strip()
+    canonical = text.where(numeric.isna(), numeric.astype(float).astype(str))
+    return canonical.where(series.notna(), "")
+
+
+def _key_values(series, table):
+    # Keys compare as stripped strings, so "007" and "7" stay two product
+    # ids; numeric keys (sale_id) compare as integers.
+    if TABLES[table]["key"] in TABLES[table]["numeric"]:
+        return pd.to_numeric(series, errors="coerce").astype("Int64").astype(str)
+    return series.astype(str).str.strip()
+
+
+def _canonical_frame(df, table):
+    spec = TABLES[table]
+    return pd.DataFrame({
+        col: _canonical(df[col], is_date=col in spec["dates"]) for col in spec["columns"]
+    })
+
+
+def _insert_sql(table):
+    columns = TABLES[table]["columns"]
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+
+
+def _upsert_sql(table):
+    spec = TABLES[table]
+    updates = ", ".join(f"{col} = VALUES({col})" for col in spec["columns"] if col != spec["key"])
+    return f"{_insert_sql(table)} ON DUPLICATE KEY UPDATE {updates}"
+
+
+def _key_table(cursor, table):
+    # Partitioned tables keep their ids unique in <table>_keys; it only
+    # exists once `python partitions.py init` has run.
+    if table not in UNIQUE_KEYS:
+        return None
+    cursor.execute("""
+        SELECT 1 FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (key_table(table),))
+    return key_table(table) if cursor.fetchall() else None
+
+
+def _write_keys(cursor, table, keys_table, rows):
+    # Claim the ids first: a reused id fails here with a duplicate-key error
+    # even though the partitioned table's (id, date) key would accept it.
+    if keys_table and rows:
+        position = TABLES[table]["columns"].index(UNIQUE_KEYS[table])
+        cursor.executemany(
+            f"INSERT INTO {keys_table} ({UNIQUE_KEYS[table]}) VALUES (%s)",
+            [[row[position]] for row in rows]
+        )
+
+
+def _insert_row(cursor, table, keys_table, sql, row):
+    # One row and its id, or neither, inside the caller's transaction
+    cursor.execute("SAVEPOINT insert_row")
+    try:
+        _write_keys(cursor, table, keys_table, [row])
+        cursor.execute(sql, row)
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT insert_row")
+        raise
+
+
+# -------------------------
+# Readers
+# -------------------------
+def iter_csv_chunks(file, chunk_size=CHUNK_SIZE, table=None):
+    # Ids are read as text so leading zeros ("007") survive and one blank id
+    # doesn't turn the rest of the column into floats ("1001.0")
+    dtype = {col: str for col in TABLES[table]["ids"]} if table else None
+    yield from pd.read_csv(file, chunksize=chunk_size, dtype=dtype)
+
+
+def _id_text(value):
+    # Excel stores a typed-in 1001 as a number; give it back as "1001"
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _frame(rows, header, offset, table):
+    # Keep a running row index across chunks and sheets for error reporting
+    frame = pd.DataFrame(rows, columns=header, index=range(offset, offset + len(rows)))
+    for col in TABLES[table]["ids"]:
+        frame[col] = frame[col].map(_id_text).astype(object)
+    return frame
+
+
+def iter_excel_chunks(file, table, chunk_size=CHUNK_SIZE):
+    """Stream rows from every worksheet whose header has the table's columns.
+
+    The workbook is opened read-only so rows are parsed lazily from the
+    sheet XML instead of building the whole workbook in memory. Raises
+    ValueError naming each sheet and the columns it lacks if none matches.
+    """
+    columns = TABLES[table]["columns"]
+    offset = 0
+    matched, skipped = False, []
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                skipped.append(f"'{sheet.title}' is empty")
+                continue
+            header = [str(col).strip() if col is not None else "" for col in header]
+            missing = [col for col in columns if col not in header]
+            if missing:
+                skipped.append(f"'{sheet.title}' lacks {', '.join(missing)}")
+                continue
+
+            width = len(header)
+            buffer = []
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+                if len(buffer) >= chunk_size:
+                    yield _frame(buffer, header, offset, table)
+                    offset += len(buffer)
+                    buffer = []
+            if buffer:
+                yield _frame(buffer, header, offset, table)
+                offset += len(buffer)
+            matched = True
+    finally:
+        workbook.close()
+    if not matched:
+        # Same outcome as a CSV with a misspelled header, not "0 rows inserted"
+        raise ValueError(f"No sheet has the {table} columns: {'; '.join(skipped)}.")
+
+
+def iter_upload_chunks(file, table, chunk_size=CHUNK_SIZE):
+    if file.name.lower().endswith(".xlsx"):
+        return iter_excel_chunks(file, table, chunk_size)
+    return iter_csv_chunks(file, chunk_size, table)
+
+
+# -------------------------
+# Validation
+# -------------------------
+def _normalize_ids(series):
+    # Same normalisation the dashboards apply before joining on product_id
+    return series.astype(str).str.strip().str.upper()
+
+
+def fetch_product_ids(conn):
+    """Every known product_id (product table plus purchased items) in one query."""
+    cursor = timed_cursor(conn)
+    cursor.execute("SELECT product_id FROM product UNION SELECT product_id FROM purchases")
+    ids = {str(product_id).strip().upper() for (product_id,) in cursor.fetchall()}
+    cursor.close()
+    return ids
+
+
+def validate_frame(df, table, product_ids=None):
+    """Check a whole batch with column-wise operations before any write.
+
+    Returns (clean, rejects): `clean` holds the table's columns with numbers
+    and dates already parsed, `rejects` holds the offending input rows plus a
+    `reason` column. Sales rows are also checked against `product_ids`.
+    """
+    spec = TABLES[table]
+    missing = [col for col in spec["columns"] if col not in df.columns]
+    if missing:
+        rejects = df.copy()
+        rejects["reason"] = f"missing column(s): {', '.join(missing)}"
+        return pd.DataFrame(columns=spec["columns"]), rejects
+
+    clean = df[spec["columns"]].copy()
+    reasons = pd.Series("", index=df.index)
+
+    def flag(mask, reason):
+        return reasons.mask(mask, reasons + reason + "; ")
+
+    for col in spec["required"]:
+        blank = clean[col].isna() | (clean[col].astype(str).str.strip() == "")
+        reasons = flag(blank, f"{col} is required")
+
+    for col in spec["numeric"]:
+        parsed = pd.to_numeric(clean[col], errors="coerce")
+        reasons = flag(parsed.isna() & clean[col].notna(), f"{col} is not a number")
+        reasons = flag(parsed < 0, f"{col} is negative")
+        clean[col] = parsed
+
+    for col in spec["dates"]:
+        parsed = pd.to_datetime(clean[col], errors="coerce")
+        reasons = flag(parsed.isna() & clean[col].notna(), f"{col} is not a valid date")
+        clean[col] = parsed
+
+    if spec["key"] in spec["numeric"]:
+        key = clean[spec["key"]]
+        reasons = flag(key.notna() & (key % 1 != 0), f"{spec['key']} is not a whole number")
+
+    if table == "sales" and product_ids is not None:
+        unknown = clean["product_id"].notna() & ~_normalize_ids(clean["product_id"]).isin(product_ids)
+        reasons = flag(unknown, "unknown product_id")
+
+    bad = reasons != ""
+    rejects = df[bad].copy()
+    rejects["reason"] = reasons[bad].str.rstrip("; ")
+    clean = clean[~bad]
+    if spec["key"] in spec["numeric"]:
+        clean[spec["key"]] = clean[spec["key"]].astype("Int64")
+    return clean, rejects
+
+
+# -------------------------
+# Append mode
+# -------------------------
+def insert_frame(conn, table, df, batch_size=BATCH_SIZE):
+    """Bulk INSERT a frame in batches; returns (inserted_count, errors).
+
+    A batch that fails is rolled back and replayed row by row so a single
+    bad row only skips itself, as the old per-row loop did.
+    """
+    columns = TABLES[table]["columns"]
+    sql = _insert_sql(table)
+    cursor = timed_cursor(conn)
+    keys_table = _key_table(cursor, table)
+    inserted, errors = 0, []
+
+    for batch in _batches(df, batch_size):
+        rows = _to_rows(batch, columns)
+        try:
+            _write_keys(cursor, table, keys_table, rows)
+            cursor.executemany(sql, rows)
+            conn.commit()
+            inserted += len(rows)
+        except Exception:
+            conn.rollback()
+            for index, row in zip(batch.index, rows):
+                try:
+                    _insert_row(cursor, table, keys_table, sql, row)
+                    inserted += 1
+                except Exception as e:
+                    errors.append((index, str(e)))
+            conn.commit()
+
+    cursor.close()
+    return inserted, errors
+
+
+def insert_frame_atomic(conn, table, df):
+    """INSERT every row in one transaction, or none of them.
+
+    Uniqueness is left to the table's primary key, or to <table>_keys once
+    the table is partitioned. If the bulk insert fails, the rows are
+    replayed one by one inside the same transaction to find every offending
+    row, then the whole transaction is rolled back.
+    Returns (inserted_count, errors).
+    """
+    columns = TABLES[table]["columns"]
+    sql = _insert_sql(table)
+    rows = _to_rows(df, columns)
+    cursor = timed_cursor(conn)
+    keys_table = _key_table(cursor, table)
+    try:
+        _write_keys(cursor, table, keys_table, rows)
+        cursor.executemany(sql, rows)
+        conn.commit()
+        return len(rows), []
+    except Exception:
+        conn.rollback()
+
+    errors = []
+    try:
+        for index, row in zip(df.index, rows):
+            try:
+                _insert_row(cursor, table, keys_table, sql, row)
+            except Exception as e:
+                errors.append((index, str(e)))
+    finally:
+        conn.rollback()
+        cursor.close()
+    return 0, errors
+
+
+# -------------------------
+# Upsert mode
+# -------------------------
+def _fetch_existing(cursor, table, keys):
+    spec = TABLES[table]
+    placeholders = ", ".join(["%s"] * len(keys))
+    cursor.execute(
+        f"SELECT {', '.join(spec['columns'])} FROM {table} WHERE {spec['key']} IN ({placeholders})",
+        keys,
+    )
+    return pd.DataFrame(cursor.fetchall(), columns=spec["columns"])
+
+
+def upsert_frame(conn, table, df, batch_size=BATCH_SIZE, seen=None):
+    """Idempotent insert-or-update by primary key.
+
+    Duplicate keys inside the file are collapsed (last row wins), each batch
+    is diffed against the rows already stored, and only new or changed rows
+    are written with INSERT ... ON DUPLICATE KEY UPDATE. Pass the same `seen`
+    set for every chunk of one upload so keys repeated across chunks count
+    as duplicates too. New ids of a partitioned table are also claimed in
+    its <table>_keys table. Returns a dict of inserted / updated / unchanged /
+    duplicates counts.
+    """
+    spec = TABLES[table]
+    key, columns = spec["key"], spec["columns"]
+    if key is None:
+        raise ValueError(f"Table '{table}' has no primary key to upsert on.")
+
+    df = df[columns].copy()
+    df["_key"] = _key_values(df[key], table)
+    if key not in spec["numeric"]:
+        df[key] = df["_key"]
+    deduped = df.drop_duplicates(subset="_key", keep="last")
+
+    # Keys already written by an earlier chunk are still written (last row
+    # wins) but counted as duplicates rather than updated / unchanged.
+    seen = set() if seen is None else seen
+    repeated = set(deduped["_key"]) & seen
+    seen.update(deduped["_key"])
+    counts = {
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "duplicates": len(df) - len(deduped) + len(repeated),
+    }
+
+    sql = _upsert_sql(table)
+    date_column = PARTITIONED.get(table)
+    cursor = timed_cursor(conn)
+    try:
+        keys_table = _key_table(cursor, table)
+        for batch in _batches(deduped, batch_size):
+            keys = [value for (value,) in _to_rows(batch, [key])]
+            existing = _fetch_existing(cursor, table, keys)
+            existing_canon = _canonical_frame(existing, table)
+            existing_canon.index = _key_values(existing[key], table).to_numpy()
+
+            incoming_canon = _canonical_frame(batch, table)
+            incoming_canon.index = batch["_key"]
+
+            is_new = ~incoming_canon.index.isin(existing_canon.index)
+            stored = existing_canon.reindex(incoming_canon.index[~is_new])
+            is_changed = (incoming_canon[~is_new] != stored).any(axis=1).to_numpy()
+
+            new_rows = batch[is_new]
+            changed_rows = batch[~is_new][is_changed]
+            if date_column and not changed_rows.empty:
+                # A partitioned table's primary key includes the date, so
+                # ON DUPLICATE KEY would add a second row when a correction
+                # moves the date; remove those stored rows first.
+                moved = (incoming_canon[~is_new][date_column] != stored[date_column]).to_numpy()
+                moved_keys = [value for (value,) in _to_rows(changed_rows[moved[is_changed]], [key])]
+                if moved_keys:
+                    cursor.execute(
+                        f"DELETE FROM {table} WHERE {key} IN ({', '.join(['%s'] * len(moved_keys))})",
+                        moved_keys
+                    )
+            _write_keys(cursor, table, keys_table, _to_rows(new_rows, columns))
+            to_write = pd.concat([new_rows, changed_rows])
+            if not to_write.empty:
+                cursor.executemany(sql, _to_rows(to_write, columns))
+
+            first = ~batch["_key"].isin(repeated).to_numpy()
+            counts["inserted"] += int((is_new & first).sum())
+            counts["updated"] += int((is_changed & first[~is_new]).sum())
+            counts["unchanged"] += int((~is_changed & first[~is_new]).sum())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return counts
@@ -13,6 +13,25 @@ config = {
 with open("Inventory Tables.sql", "r") as file:
     sql_commands = file.read()
 
+# Columns added after the initial schema
+COLUMNS = [
+    # Change tracking for the delta-sync loader (delta_sync.py)
+    "ALTER TABLE sales ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+    "ALTER TABLE product ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+]
+
+# Indexes the dashboards rely on
+INDEXES = [
+    # Accounts-payable aging and due-date alerts (pages/2_Purchases.py)
+    "CREATE INDEX idx_purchases_status_due ON purchases (payment_status, payment_due_date)",
+    # Delta sync: rows changed since the last refresh
+    "CREATE INDEX idx_sales_updated_at ON sales (updated_at)",
+    "CREATE INDEX idx_product_updated_at ON product (updated_at)",
+    # Date-range reads within a partition (partitions.py)
+    "CREATE INDEX idx_sales_date ON sales (sales_date)",
+    "CREATE INDEX idx_purchases_order_date ON purchases (order_date)",
+]
+
 try:
     # Connect to the database
     conn = mysql.connector.connect(**config)
@@ -23,6 +42,22 @@ try:
         command = command.strip()
         if command:
             cursor.execute(command)
+
+    for command in COLUMNS:
+        try:
+            cursor.execute(command)
+        except mysql.connector.Error as err:
+            # 1060 = duplicate column name, i.e. already migrated
+            if err.errno != 1060:
+                raise
+
+    for command in INDEXES:
+        try:
+            cursor.execute(command)
+        except mysql.connector.Error as err:
+            # 1061 = duplicate key name, i.e. the index already exists
+            if err.errno != 1061:
+                raise
     
     conn.commit()
     print("✅ Database initialized successfully.")
@@ -1,151 +1,250 @@
 import streamlit as st
 import pandas as pd
-from db_connector import get_connection
+from mysql.connector.errors import PoolError
+from db_connector import mark_written, pooled_connection
+from ingest import (
+    TABLES, fetch_product_ids, insert_frame, insert_frame_atomic,
+    iter_upload_chunks, upsert_frame, validate_frame
+)
 
 st.title("📤 Upload or Add Inventory Data")
 
-conn = get_connection()
-if conn is None:
-    st.stop()
-
-cursor = conn.cursor()
+st.markdown("### Upload CSV or Excel Files")
+st.caption("Excel workbooks may hold several sheets — every sheet whose header row has the table's columns is imported.")
+
+ingest_mode = st.radio(
+    "Ingest Mode", ["Append", "Upsert"], horizontal=True,
+    help="Upsert inserts new rows and updates existing ones by primary key "
+         "(product_id / sale_id), so a corrected file can be re-uploaded safely. "
+         "Purchases are always appended."
+)
+
+
+def report_append(label, inserted, errors):
+    for index, error in errors[:20]:
+        st.warning(f"⚠️ Skipped row {index} due to error: {error}")
+    if len(errors) > 20:
+        st.warning(f"⚠️ ... and {len(errors) - 20} more skipped rows.")
+    st.success(f"✅ {label} data uploaded successfully! ({inserted} rows inserted)")
+
+
+def report_upsert(label, counts):
+    st.success(
+        f"✅ {label} data synced: {counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged ({counts['duplicates']} duplicate rows in file collapsed)."
+    )
+
+
+def report_busy():
+    st.warning("⏳ Every database connection is busy with other uploads. Please try again in a moment.")
+
+
+def report_rejects(label, table, rejects):
+    if rejects.empty:
+        return
+    st.warning(f"⚠️ {len(rejects)} {label.lower()} row(s) failed validation and were not loaded.")
+    st.dataframe(rejects.head(100), use_container_width=True)
+    st.download_button(
+        f"⬇️ Download rejected {label.lower()} rows",
+        rejects.to_csv(index=False).encode("utf-8"),
+        file_name=f"{table}_rejects.csv",
+        mime="text/csv",
+        key=f"{table}_rejects",
+        on_click="ignore"
+    )
+
+
+def validated_chunks(conn, table, file, rejected):
+    # Every chunk is validated as a whole before it reaches MySQL; only the
+    # clean part is written and the rejects are collected for download.
+    product_ids = fetch_product_ids(conn) if table == "sales" else None
+    for chunk in iter_upload_chunks(file, table):
+        clean, rejects = validate_frame(chunk, table, product_ids)
+        rejected.append(rejects)
+        if not clean.empty:
+            yield clean
+
+
+def ingest_upload(label, table, file):
+    # Any rerun while the file is still in the uploader must not load it a
+    # second time, so each upload (file_id) is ingested once per session.
+    upload_key = f"{table}_upload"
+    done = st.session_state.get(upload_key)
+    if done and done["file_id"] == file.file_id:
+        st.info(f"ℹ️ {file.name} has already been loaded. Remove it and upload it again to reload it.")
+        report_rejects(label, table, done["rejects"])
+        return
+
+    # Each upload runs on a pooled connection of its own, so another
+    # session's commit or rollback can't touch its transaction.
+    try:
+        with pooled_connection() as conn:
+            loaded, rejected = load_upload(conn, label, table, file)
+    except PoolError:
+        report_busy()
+        return
+    except Exception as e:
+        st.error(f"❌ Error loading {label.lower()} data.")
+        st.code(str(e))
+        return
+    # Only once the rows are committed (an Append that stopped early may
+    # still have committed some): start the read-your-writes window and drop
+    # cached aggregates, so neither predates the data.
+    mark_written()
+    rejects = pd.concat(rejected) if rejected else pd.DataFrame()
+    # Only a completed load is remembered; after an error the same file can
+    # simply be retried
+    if loaded:
+        st.session_state[upload_key] = {"file_id": file.file_id, "rejects": rejects}
+    report_rejects(label, table, rejects)
+
+
+def load_upload(conn, label, table, file):
+    # Files are read in chunks (CSV) or streamed sheet by sheet (Excel) so
+    # large uploads never sit in memory as a single frame. Returns (loaded,
+    # rejected), where `loaded` is False if the load stopped on an error.
+    rejected = []
+    if ingest_mode == "Upsert" and TABLES[table]["key"]:
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0}
+        seen = set()
+        try:
+            for chunk in validated_chunks(conn, table, file, rejected):
+                for name, value in upsert_frame(conn, table, chunk, seen=seen).items():
+                    counts[name] += value
+        except Exception as e:
+            st.error(f"❌ Error syncing {label.lower()} data.")
+            st.code(str(e))
+            return False, rejected
+        report_upsert(label, counts)
+    else:
+        inserted, errors = 0, []
+        try:
+            for chunk in validated_chunks(conn, table, file, rejected):
+                chunk_inserted, chunk_errors = insert_frame(conn, table, chunk)
+                inserted += chunk_inserted
+                errors.extend(chunk_errors)
+        except Exception as e:
+            # Batches are committed as they go, so say how far the load got
+            st.error(f"❌ Error loading {label.lower()} data after {inserted} row(s) were inserted.")
+            st.code(str(e))
+            return False, rejected
+        report_append(label, inserted, errors)
+    return True, rejected
 
-st.markdown("### Upload CSV Files")
 
 # --- PRODUCT UPLOAD ---
-product_file = st.file_uploader("Upload Product CSV", type=["csv"])
+product_file = st.file_uploader("Upload Product File", type=["csv", "xlsx"])
 if product_file:
-    df = pd.read_csv(product_file)
-    for _, row in df.iterrows():
-        try:
-            cursor.execute("""
-                INSERT INTO product (product_id, product_name, category, stock)
-                VALUES (%s, %s, %s, %s)
-            """, (row['product_id'], row['product_name'], row['category'], row['stock']))
-        except Exception as e:
-            st.warning(f"⚠️ Skipped a row due to error: {e}")
-    conn.commit()
-    st.success("✅ Product data uploaded successfully!")
+    ingest_upload("Product", "product", product_file)
 
 # --- PURCHASE UPLOAD ---
-purchase_file = st.file_uploader("Upload Purchase CSV", type=["csv"])
+purchase_file = st.file_uploader("Upload Purchase File", type=["csv", "xlsx"])
 if purchase_file:
-    df = pd.read_csv(purchase_file)
-    for _, row in df.iterrows():
-        try:
-            cursor.execute("""
-                INSERT INTO purchases (product_id, product_name, category, vendor_name, order_date,
-                    quantity_purchased, cost_price, payment_due_date, payment_status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (row['product_id'], row['product_name'], row['category'], row['vendor_name'],
-                  row['order_date'], row['quantity_purchased'], row['cost_price'],
-                  row['payment_due_date'], row['payment_status']))
-        except Exception as e:
-            st.warning(f"⚠️ Skipped a row due to error: {e}")
-    conn.commit()
-    st.success("✅ Purchase data uploaded successfully!")
+    ingest_upload("Purchase", "purchases", purchase_file)
 
 # --- SALES UPLOAD ---
-sales_file = st.file_uploader("Upload Sales CSV", type=["csv"])
+sales_file = st.file_uploader("Upload Sales File", type=["csv", "xlsx"])
 if sales_file:
-    df = pd.read_csv(sales_file)
-    for _, row in df.iterrows():
-        try:
-            cursor.execute("""
-                INSERT INTO sales (sale_id, product_id, selling_price, quantity_sold, sales_date,
-                    shipped_status, payment_status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (row['sale_id'], row['product_id'], row['selling_price'], row['quantity_sold'],
-                  row['sales_date'], row['shipped_status'], row['payment_status']))
-        except Exception as e:
-            st.warning(f"⚠️ Skipped a row due to error: {e}")
-    conn.commit()
-    st.success("✅ Sales data uploaded successfully!")
+    ingest_upload("Sales", "sales", sales_file)
 
 # --------------------- MANUAL DATA ENTRY SECTION ---------------------
 
 st.markdown("### 📋 Add Data Manually")
-
-# --- Add Purchase ---
-with st.expander("➕ Add New Purchase"):
-    with st.form("add_purchase_form"):
-        product_id = st.text_input("Product ID (existing or new)")
-        product_name = st.text_input("Product Name")
-        category = st.text_input("Category")
-        vendor_name = st.text_input("Vendor Name")
-        order_date = st.date_input("Order Date")
-        quantity_purchased = st.number_input("Quantity Purchased", min_value=1)
-        cost_price = st.number_input("Cost Price", min_value=0.0)
-        payment_due_date = st.date_input("Payment Due Date")
-        payment_status = st.selectbox("Payment Status", ["Pending", "Paid", "Overdue"])
-        submit = st.form_submit_button("Add Purchase")
-
-        if submit:
-            try:
-                cursor.execute("""
-                    INSERT INTO purchases (product_id, product_name, category, vendor_name, order_date,
-                        quantity_purchased, cost_price, payment_due_date, payment_status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (product_id, product_name, category, vendor_name, order_date,
-                      quantity_purchased, cost_price, payment_due_date, payment_status))
-                conn.commit()
-                st.success("✅ Purchase added successfully!")
-            except Exception as e:
-                st.error("❌ Error inserting purchase.")
-                st.code(str(e))
-
-# --- Add Product ---
-with st.expander("➕ Add New Product"):
-    with st.form("add_product_form"):
-        product_id = st.text_input("Product ID")
-        product_name = st.text_input("Product Name")
-        category = st.text_input("Category")
-        stock = st.number_input("Stock Quantity", min_value=0)
-        submit = st.form_submit_button("Add Product")
-
-        if submit:
-            try:
-                cursor.execute("SELECT 1 FROM product WHERE product_id = %s", (product_id,))
-                if cursor.fetchone():
-                    st.error("❌ Product ID already exists.")
-                else:
-                    cursor.execute("""
-                        INSERT INTO product (product_id, product_name, category, stock)
-                        VALUES (%s, %s, %s, %s)
-                    """, (product_id, product_name, category, stock))
-                    conn.commit()
-                    st.success("✅ Product added successfully!")
-            except Exception as e:
-                st.error("❌ Error inserting product.")
-                st.code(str(e))
-
-
-# --- Add Sale ---
-with st.expander("➕ Add New Sale"):
-    with st.form("add_sale_form"):
-        sale_id = st.number_input("Sale ID", min_value=1)
-        product_id = st.text_input("Product ID")
-        selling_price = st.number_input("Selling Price", min_value=0.0)
-        quantity_sold = st.number_input("Quantity Sold", min_value=1)
-        sales_date = st.date_input("Sales Date")
-        shipped_status = st.selectbox("Shipped Status", ["Shipped", "Pending", "Cancelled"])
-        payment_status = st.selectbox("Payment Status", ["Received", "Pending"])
-        submit = st.form_submit_button("Add Sale")
-
-        if submit:
-            try:
-                cursor.execute("SELECT 1 FROM sales WHERE sale_id = %s", (sale_id,))
-                if cursor.fetchone():
-                    st.error("❌ Sale ID already exists.")
-                else:
-                    cursor.execute("""
-                        INSERT INTO sales (sale_id, product_id, selling_price, quantity_sold, sales_date,
-                            shipped_status, payment_status)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """, (sale_id, product_id, selling_price, quantity_sold,
-                          sales_date, shipped_status, payment_status))
-                    conn.commit()
-                    st.success("✅ Sale added successfully!")
-            except Exception as e:
-                st.error("❌ Error inserting sale.")
-                st.code(str(e))
+st.caption("Key in as many rows as needed — each grid is saved in a single transaction, so either every row is added or none are.")
+
+GRID_COLUMNS = {
+    "purchases": {
+        "product_id": st.column_config.TextColumn("Product ID (existing or new)", required=True),
+        "product_name": st.column_config.TextColumn("Product Name"),
+        "category": st.column_config.TextColumn("Category"),
+        "vendor_name": st.column_config.TextColumn("Vendor Name", required=True),
+        "order_date": st.column_config.DateColumn("Order Date", required=True),
+        "quantity_purchased": st.column_config.NumberColumn("Quantity Purchased", min_value=1, step=1, required=True),
+        "cost_price": st.column_config.NumberColumn("Cost Price", min_value=0.0, required=True),
+        "payment_due_date": st.column_config.DateColumn("Payment Due Date"),
+        "payment_status": st.column_config.SelectboxColumn("Payment Status", options=["Pending", "Paid", "Overdue"], default="Pending"),
+    },
+    "product": {
+        "product_id": st.column_config.TextColumn("Product ID", required=True),
+        "product_name": st.column_config.TextColumn("Product Name", required=True),
+        "category": st.column_config.TextColumn("Category"),
+        "stock": st.column_config.NumberColumn("Stock Quantity", min_value=0, step=1, default=0),
+    },
+    "sales": {
+        "sale_id": st.column_config.NumberColumn("Sale ID", min_value=1, step=1, required=True),
+        "product_id": st.column_config.TextColumn("Product ID", required=True),
+        "selling_price": st.column_config.NumberColumn("Selling Price", min_value=0.0, required=True),
+        "quantity_sold": st.column_config.NumberColumn("Quantity Sold", min_value=1, step=1, required=True),
+        "sales_date": st.column_config.DateColumn("Sales Date", required=True),
+        "shipped_status": st.column_config.SelectboxColumn("Shipped Status", options=["Shipped", "Pending", "Cancelled"], default="Pending"),
+        "payment_status": st.column_config.SelectboxColumn("Payment Status", options=["Received", "Pending"], default="Pending"),
+    },
+}
+
+
+def grid_entry(label, table):
+    # Bumping the version gives the editor a fresh key, which clears it after a save
+    version_key = f"{table}_grid_version"
+    st.session_state.setdefault(version_key, 0)
+
+    spec = TABLES[table]
+    empty = pd.DataFrame({
+        col: pd.Series(dtype="datetime64[ns]" if col in spec["dates"] else
+                       "float" if col in spec["numeric"] else "object")
+        for col in spec["columns"]
+    })
+    rows = st.data_editor(
+        empty,
+        column_config=GRID_COLUMNS[table],
+        num_rows="dynamic",
+        use_container_width=True,
+        key=f"{table}_grid_{st.session_state[version_key]}"
+    )
+
+    if not st.button(f"Add {label} Rows", key=f"{table}_grid_submit"):
+        return
+
+    rows = rows.dropna(how="all")
+    if rows.empty:
+        st.info("ℹ️ Add at least one row first.")
+        return
+
+    try:
+        with pooled_connection() as conn:
+            product_ids = fetch_product_ids(conn) if table == "sales" else None
+            clean, rejects = validate_frame(rows, table, product_ids)
+            if not rejects.empty:
+                st.error(f"❌ {len(rejects)} row(s) need fixing before anything is saved.")
+                st.dataframe(rejects, use_container_width=True)
+                return
+
+            inserted, errors = insert_frame_atomic(conn, table, clean)
+    except PoolError:
+        # The grid keeps its rows, so pressing the button again retries
+        report_busy()
+        return
+    if errors:
+        st.error(f"❌ {len(errors)} row(s) were rejected by the database — nothing was saved.")
+        st.dataframe(
+            pd.DataFrame(errors, columns=["row", "error"]).set_index("row"),
+            use_container_width=True
+        )
+        return
+
+    # After the commit, so the window and the cache clear follow the write
+    mark_written()
+    st.session_state[version_key] += 1
+    st.success(f"✅ {inserted} {label.lower()} row(s) added successfully!")
+
+
+# --- Add Purchases ---
+with st.expander("➕ Add New Purchases"):
+    grid_entry("Purchase", "purchases")
+
+# --- Add Products ---
+with st.expander("➕ Add New Products"):
+    grid_entry("Product", "product")
+
+# --- Add Sales ---
+with st.expander("➕ Add New Sales"):
+    grid_entry("Sale", "sales")
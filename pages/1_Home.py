@@ -1,20 +1,26 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from db_connector import get_connection
+from db_connector import fetch_query
+from delta_sync import load_table, table_version
+import charts
+import perf
 
 st.set_page_config(page_title="📊 Retail Dashboard", layout="wide")
 st.title("📊 Retail Dashboard")
-
-# Connect to SQL
-db = get_connection()
+timer = perf.page_timer("Home")
 
 # Load data
-product_df = pd.read_sql("SELECT * FROM product", db)
-purchases_df = pd.read_sql("SELECT product_id, product_name, category, quantity_purchased, cost_price, order_date FROM purchases", db)
-sales_df = pd.read_sql("SELECT product_id, quantity_sold, selling_price, sales_date FROM sales", db)
+timer.mark("query")
+product_df = load_table("product")
+purchases_df = fetch_query("SELECT product_id, product_name, category, quantity_purchased, cost_price, order_date FROM purchases")
+sales_df = load_table("sales", ['product_id', 'quantity_sold', 'selling_price', 'sales_date'])
+timer.add_rows(len(product_df) + len(purchases_df) + len(sales_df))
+# Part of every chart key, so another session's upload shows up at once
+data_version = (table_version("product"), table_version("sales"), charts.frame_version(purchases_df))
 
 # Combine unique products from both product and purchases tables
+timer.mark("transform")
 combined_products = pd.concat([
     product_df[['product_id', 'product_name', 'category']],
     purchases_df[['product_id', 'product_name', 'category']]
@@ -24,6 +30,7 @@ combined_products = pd.concat([
 # Sidebar Filters
 # -------------------------
 st.sidebar.header("🔍 Filter Dashboard")
+perf.panel_toggle()
 category_filter = st.sidebar.multiselect(
     "Select Categories", combined_products['category'].dropna().unique(), default=combined_products['category'].unique()
 )
@@ -56,6 +63,7 @@ sales_profit = sales_df.merge(purchases_df[['product_id', 'cost_price']], on='pr
 sales_profit['profit'] = sales_profit['quantity_sold'] * (sales_profit['selling_price'] - sales_profit['cost_price'])
 total_profit = sales_profit['profit'].sum()
 
+timer.mark("render")
 st.markdown("### Key Performance Metrics")
 k1, k2, k3, k4, k5 = st.columns(5)
 with k1:
@@ -72,6 +80,7 @@ with k5:
 # Highlights
 st.markdown("---")
 st.markdown("### 🔥 Highlights")
+timer.mark("transform")
 top_product = sales_df.groupby('product_id')['quantity_sold'].sum().reset_index()
 top_product = top_product.merge(filtered_products, on='product_id', how='left')
 top_product = top_product.sort_values(by='quantity_sold', ascending=False).head(1)
@@ -85,6 +94,7 @@ past_sales = sales_df[sales_df['sales_date'] <= pd.Timestamp.now() - pd.Timedelt
 change = recent_sales['quantity_sold'].sum() - past_sales['quantity_sold'].sum()
 trend_icon = "📈" if change >= 0 else "📉"
 
+timer.mark("render")
 h1, h2, h3 = st.columns(3)
 with h1:
     if not top_product.empty:
@@ -100,54 +110,85 @@ st.markdown("---")
 st.markdown("### ⚠️ Low Stock Alerts")
 threshold = st.slider("Set stock threshold", 1, 50, 10)
 
+timer.mark("transform")
 live_inventory = filtered_products.merge(stock_merged[['product_id', 'live_stock']], on='product_id', how='left')
 live_inventory['live_stock'].fillna(0, inplace=True)
 low_stock = live_inventory[live_inventory['live_stock'] < threshold]
 
+timer.mark("render")
 if not low_stock.empty:
     st.error(f"⚠️ {len(low_stock)} product(s) are low on stock.")
     st.dataframe(low_stock[['product_id', 'product_name', 'live_stock']], use_container_width=True)
 else:
     st.success("✅ All products have sufficient stock.")
 
+# Charts are memoized on the data version and the sidebar filters, so moving
+# the threshold slider doesn't rebuild them
+filter_state = (data_version, tuple(category_filter), tuple(product_filter))
+
+
+def dated_sales():
+    dated = sales_df.dropna(subset=['sales_date']).copy()
+    dated['month'] = dated['sales_date'].dt.to_period('M').astype(str)
+    return dated
+
+
+def monthly_sales_figure():
+    dated = dated_sales()
+    monthly_metrics = dated.groupby('month').agg({
+        'quantity_sold': 'sum',
+        'selling_price': 'mean'
+    }).reset_index()
+    monthly_metrics['revenue'] = monthly_metrics['quantity_sold'] * monthly_metrics['selling_price']
+
+    dated = dated.merge(purchases_df[['product_id', 'cost_price']], on='product_id', how='left')
+    dated['profit'] = dated['quantity_sold'] * (dated['selling_price'] - dated['cost_price'])
+    monthly_profit = dated.groupby('month')['profit'].sum().reset_index()
+    monthly_metrics = monthly_metrics.merge(monthly_profit, on='month', how='left')
+
+    fig = px.line(monthly_metrics, x='month', y=['quantity_sold', 'revenue', 'profit'],
+                  title="Monthly Sales Overview",
+                  markers=True, template='plotly_dark')
+    fig.update_layout(
+        legend_title_text='Metric',
+        xaxis_title="Month",
+        yaxis_title="Amount",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def category_figure():
+    dated = dated_sales().merge(purchases_df[['product_id', 'cost_price']], on='product_id', how='left')
+    category_sales = dated.merge(filtered_products, on='product_id', how='left')
+    category_grouped = category_sales.groupby('category')['quantity_sold'].sum().reset_index()
+    if category_grouped.empty:
+        return None
+    return px.bar(category_grouped, x='category', y='quantity_sold', title="Category-wise Sales",
+                  color='quantity_sold', template='plotly_dark')
+
+
 # Monthly Sales Chart
 st.markdown("---")
 st.markdown("### 🗕️ Monthly Sales Overview")
-sales_df = sales_df.dropna(subset=['sales_date'])
-sales_df['month'] = sales_df['sales_date'].dt.to_period('M').astype(str)
-
-monthly_metrics = sales_df.groupby('month').agg({
-    'quantity_sold': 'sum',
-    'selling_price': 'mean'
-}).reset_index()
-monthly_metrics['revenue'] = monthly_metrics['quantity_sold'] * monthly_metrics['selling_price']
-
-sales_df = sales_df.merge(purchases_df[['product_id', 'cost_price']], on='product_id', how='left')
-sales_df['profit'] = sales_df['quantity_sold'] * (sales_df['selling_price'] - sales_df['cost_price'])
-sales_df['month'] = sales_df['sales_date'].dt.to_period('M').astype(str)
-monthly_profit = sales_df.groupby('month')['profit'].sum().reset_index()
-monthly_metrics = monthly_metrics.merge(monthly_profit, on='month', how='left')
-
-fig = px.line(monthly_metrics, x='month', y=['quantity_sold', 'revenue', 'profit'],
-              title="Monthly Sales Overview",
-              markers=True, template='plotly_dark')
-fig.update_layout(
-    legend_title_text='Metric',
-    xaxis_title="Month",
-    yaxis_title="Amount",
-    plot_bgcolor='rgba(0,0,0,0)',
-    paper_bgcolor='rgba(0,0,0,0)'
-)
+timer.mark("chart")
+fig = charts.figure("home_monthly", filter_state, monthly_sales_figure)
+timer.mark("render")
 st.plotly_chart(fig, use_container_width=True)
 
 # Category-wise Sales
 st.markdown("---")
 st.markdown("###  Visual Insights")
-category_sales = sales_df.merge(filtered_products, on='product_id', how='left')
-category_grouped = category_sales.groupby('category')['quantity_sold'].sum().reset_index()
-
-if not category_grouped.empty:
-    category_fig = px.bar(category_grouped, x='category', y='quantity_sold', title="Category-wise Sales", color='quantity_sold', template='plotly_dark')
-    st.plotly_chart(category_fig, use_container_width=True)
-else:
-    st.info("No sales data available to display category-wise insights.")
+category_section = st.expander("📊 Category-wise Sales", key="home_category_chart", on_change="rerun")
+if charts.is_open(category_section):
+    with category_section:
+        timer.mark("chart")
+        category_fig = charts.figure("home_category", filter_state, category_figure)
+        timer.mark("render")
+        if category_fig is not None:
+            st.plotly_chart(category_fig, use_container_width=True)
+        else:
+            st.info("No sales data available to display category-wise insights.")
+
+perf.finish_page(timer)
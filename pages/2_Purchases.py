@@ -1,36 +1,44 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from db_connector import get_connection
+from db_connector import fetch_query
+from export import export_panel, purchases_export_query, purchases_filter
+from payables import AGING_BUCKETS, OVERDUE_BUCKETS, aging_by_vendor, most_overdue, upcoming_due
+import charts
+import perf
 
 st.set_page_config(page_title="📥 Purchases", layout="wide")
 st.title("📥 Purchase Overview")
+timer = perf.page_timer("Purchases")
 
 # -------------------------
-# Connect to SQL
+# All-time KPIs, aggregated in MySQL
 # -------------------------
-conn = get_connection()
+@st.cache_data(ttl=300)
+def purchase_totals():
+    totals = fetch_query("""
+        SELECT COUNT(*) AS orders,
+            COALESCE(SUM(quantity_purchased), 0) AS quantity,
+            COALESCE(SUM(quantity_purchased * cost_price), 0) AS cost,
+            COUNT(DISTINCT vendor_name) AS vendors,
+            MIN(order_date) AS first_date,
+            MAX(order_date) AS last_date
+        FROM purchases
+    """)
+    return totals.iloc[0]
 
-# -------------------------
-# Load Data from SQL
-# -------------------------
-purchases = pd.read_sql("SELECT * FROM purchases", conn)
 
-# Convert date columns
-purchases['order_date'] = pd.to_datetime(purchases['order_date'], errors='coerce')
-purchases['payment_due_date'] = pd.to_datetime(purchases['payment_due_date'], errors='coerce')
-
-# -------------------------
-# Compute KPIs
-# -------------------------
-total_orders = len(purchases)
-total_quantity = purchases['quantity_purchased'].sum()
-total_cost = (purchases['quantity_purchased'] * purchases['cost_price']).sum()
-vendors = purchases['vendor_name'].nunique()
+timer.mark("query")
+totals = purchase_totals()
+total_orders = int(totals['orders'])
+total_quantity = float(totals['quantity'])
+total_cost = float(totals['cost'])
+vendors = int(totals['vendors'])
 
 # -------------------------
 # KPI Display
 # -------------------------
+timer.mark("render")
 st.markdown("###  Key Purchase Metrics")
 k1, k2, k3, k4 = st.columns(4)
 with k1:
@@ -46,6 +54,27 @@ with k4:
 # Sidebar Filters
 # -------------------------
 st.sidebar.header("🔍 Filter Purchases")
+perf.panel_toggle()
+start_date = st.sidebar.date_input("Start Date", totals['first_date'])
+end_date = st.sidebar.date_input("End Date", totals['last_date'])
+
+# -------------------------
+# Load the selected date range
+# -------------------------
+# purchases is partitioned by month on order_date (see partitions.py);
+# comparing the bare column lets MySQL prune to the partitions in range.
+timer.mark("query")
+purchases = fetch_query(
+    "SELECT * FROM purchases WHERE order_date BETWEEN %s AND %s", (start_date, end_date)
+)
+timer.add_rows(len(purchases))
+# Part of every chart key, so another session's upload shows up at once
+data_version = charts.frame_version(purchases)
+
+# Convert date columns
+timer.mark("transform")
+purchases['order_date'] = pd.to_datetime(purchases['order_date'], errors='coerce')
+purchases['payment_due_date'] = pd.to_datetime(purchases['payment_due_date'], errors='coerce')
 
 product_filter = st.sidebar.multiselect(
     "Product", purchases['product_name'].dropna().unique(), default=purchases['product_name'].unique()
@@ -56,21 +85,19 @@ vendor_filter = st.sidebar.multiselect(
 status_filter = st.sidebar.multiselect(
     "Payment Status", purchases['payment_status'].dropna().unique(), default=purchases['payment_status'].unique()
 )
-start_date = st.sidebar.date_input("Start Date", purchases['order_date'].min())
-end_date = st.sidebar.date_input("End Date", purchases['order_date'].max())
 
 # Apply filters
+timer.mark("transform")
 filtered = purchases[
     (purchases['product_name'].isin(product_filter)) &
     (purchases['vendor_name'].isin(vendor_filter)) &
-    (purchases['payment_status'].isin(status_filter)) &
-    (purchases['order_date'] >= pd.to_datetime(start_date)) &
-    (purchases['order_date'] <= pd.to_datetime(end_date))
+    (purchases['payment_status'].isin(status_filter))
 ]
 
 # -------------------------
 # Display Filtered Table
 # -------------------------
+timer.mark("render")
 st.markdown("### 📦 Purchase Records")
 expected_cols = [
     'product_id', 'product_name', 'category', 'vendor_name',
@@ -79,82 +106,154 @@ expected_cols = [
 available_cols = [col for col in expected_cols if col in filtered.columns]
 st.dataframe(filtered[available_cols], use_container_width=True)
 
+sidebar_filters = (
+    product_filter, purchases['product_name'].dropna().unique(),
+    vendor_filter, purchases['vendor_name'].dropna().unique(),
+    status_filter, purchases['payment_status'].dropna().unique(),
+    start_date, end_date
+)
+export_panel("purchases", *purchases_export_query(*sidebar_filters))
+
 # -------------------------
-# Payment Alerts
+# Payment Alerts & Accounts-Payable Aging
 # -------------------------
 st.markdown("---")
 st.markdown("### ⚠️ Payment Alerts")
 
-today = pd.to_datetime("today")
-pending = filtered[filtered['payment_status'].str.lower() == "pending"]
-overdue = filtered[(filtered['payment_status'].str.lower() != "paid") & (filtered['payment_due_date'] < today)]
+st.caption("Open = every line not marked Paid, within the sidebar filters.")
 
-col1, col2 = st.columns(2)
+# Aggregated in MySQL over the (payment_status, payment_due_date) index and
+# cached per filter selection, so the alerts don't rescan every purchase
+# line on each rerun.
+timer.mark("query")
+alert_filter = purchases_filter(*sidebar_filters)
+aging = aging_by_vendor(*alert_filter)
+timer.add_rows(len(aging))
 
+timer.mark("render")
+col1, col2 = st.columns(2)
 with col1:
-    st.warning(f"🕐 Pending Payments: {len(pending)}")
-    if not pending.empty:
-        st.dataframe(pending[['vendor_name', 'product_name', 'payment_due_date']], use_container_width=True)
-
+    st.warning(f"🕐 Open Payments: {int(aging['open_lines'].sum())} "
+               f"(₹ {aging['total_due'].sum():,.2f})")
 with col2:
-    st.error(f"❌ Overdue Payments: {len(overdue)}")
-    if not overdue.empty:
-        st.dataframe(overdue[['vendor_name', 'product_name', 'payment_due_date']], use_container_width=True)
+    overdue_total = aging[OVERDUE_BUCKETS].sum().sum()
+    st.error(f"❌ Overdue Payments: {int(aging['overdue_lines'].sum())} "
+             f"(₹ {overdue_total:,.2f})")
 
-# -------------------------
-# Vendor-wise Purchases
-# -------------------------
-st.markdown("---")
-st.markdown("### 🏢 Vendor-wise Purchases")
-
-vendor_summary = filtered.groupby('vendor_name')['quantity_purchased'].sum().reset_index()
-fig_vendor = px.bar(
-    vendor_summary,
-    x='vendor_name',
-    y='quantity_purchased',
-    title="📊 Quantity Purchased by Vendor",
-    color='quantity_purchased',
-    text='quantity_purchased',
-    template='plotly_dark'
-)
-fig_vendor.update_traces(textposition="outside")
-fig_vendor.update_layout(xaxis_title="Vendor", yaxis_title="Quantity", showlegend=False)
-st.plotly_chart(fig_vendor, use_container_width=True)
+st.markdown("#### 🗂️ Payables Aging by Vendor")
+if aging.empty:
+    st.success("✅ No open payments for the selected filters.")
+else:
+    st.dataframe(
+        aging.set_index('vendor_name')[AGING_BUCKETS + ['total_due']].round(2),
+        use_container_width=True
+    )
+    timer.mark("chart")
+    fig_aging = px.bar(
+        aging.melt(id_vars='vendor_name', value_vars=AGING_BUCKETS, var_name='bucket', value_name='amount'),
+        x='vendor_name',
+        y='amount',
+        color='bucket',
+        category_orders={'bucket': AGING_BUCKETS},
+        title="Amount Due by Age (days past due)",
+        template='plotly_dark'
+    )
+    fig_aging.update_layout(xaxis_title="Vendor", yaxis_title="Amount Due")
+    timer.mark("render")
+    st.plotly_chart(fig_aging, use_container_width=True)
 
-# -------------------------
-# Monthly Purchase Trend
-# -------------------------
-st.markdown("---")
-st.markdown("### 📆 Monthly Purchase Trend")
-
-filtered['month'] = filtered['order_date'].dt.to_period('M').astype(str)
-monthly_summary = filtered.groupby('month')['quantity_purchased'].sum().reset_index()
-
-fig_monthly = px.line(
-    monthly_summary,
-    x='month',
-    y='quantity_purchased',
-    title="📈 Monthly Purchase Volume",
-    markers=True,
-    template='plotly_dark'
-)
-fig_monthly.update_layout(xaxis_title="Month", yaxis_title="Quantity Purchased")
-st.plotly_chart(fig_monthly, use_container_width=True)
+    with st.expander("❌ Most Overdue Lines"):
+        st.dataframe(most_overdue(100, *alert_filter), use_container_width=True)
+
+st.markdown("#### 📅 Upcoming Due Dates")
+horizon = st.slider("Days Ahead", 7, 90, 30)
+timer.mark("query")
+upcoming = upcoming_due(horizon, *alert_filter)
+timer.mark("render")
+if upcoming.empty:
+    st.info(f"No payments due in the next {horizon} days.")
+else:
+    timer.mark("chart")
+    fig_upcoming = px.bar(
+        upcoming,
+        x='payment_due_date',
+        y='amount_due',
+        color='vendor_name',
+        hover_data=['lines'],
+        title=f"Payments Due in the Next {horizon} Days",
+        template='plotly_dark'
+    )
+    fig_upcoming.update_layout(xaxis_title="Due Date", yaxis_title="Amount Due")
+    timer.mark("render")
+    st.plotly_chart(fig_upcoming, use_container_width=True)
 
 # -------------------------
-# Purchase Breakdown by Product
+# Charts — each section builds its figure only while expanded, and figures
+# are memoized on the data version and the sidebar filters
 # -------------------------
+filter_state = (data_version, start_date, end_date, tuple(product_filter), tuple(vendor_filter), tuple(status_filter))
+
+
+def vendor_figure():
+    vendor_summary = filtered.groupby('vendor_name')['quantity_purchased'].sum().reset_index()
+    fig_vendor = px.bar(
+        vendor_summary,
+        x='vendor_name',
+        y='quantity_purchased',
+        title="📊 Quantity Purchased by Vendor",
+        color='quantity_purchased',
+        text='quantity_purchased',
+        template='plotly_dark'
+    )
+    fig_vendor.update_traces(textposition="outside")
+    fig_vendor.update_layout(xaxis_title="Vendor", yaxis_title="Quantity", showlegend=False)
+    return fig_vendor
+
+
+def monthly_figure():
+    months = filtered['order_date'].dt.to_period('M').astype(str)
+    monthly_summary = filtered.groupby(months.rename('month'))['quantity_purchased'].sum().reset_index()
+    fig_monthly = px.line(
+        monthly_summary,
+        x='month',
+        y='quantity_purchased',
+        title="📈 Monthly Purchase Volume",
+        markers=True,
+        template='plotly_dark'
+    )
+    fig_monthly.update_layout(xaxis_title="Month", yaxis_title="Quantity Purchased")
+    return fig_monthly
+
+
+def product_figure():
+    product_summary = filtered.groupby('product_name')['quantity_purchased'].sum().reset_index().sort_values(by='quantity_purchased', ascending=False)
+    fig_product = px.bar(
+        product_summary,
+        x='product_name',
+        y='quantity_purchased',
+        title="Top Products by Purchase Volume",
+        color='quantity_purchased',
+        template='plotly_dark'
+    )
+    fig_product.update_layout(xaxis_title="Product", yaxis_title="Quantity", showlegend=False)
+    return fig_product
+
+
+chart_sections = [
+    ("purchases_vendor", "🏢 Vendor-wise Purchases", vendor_figure),
+    ("purchases_monthly", "📆 Monthly Purchase Trend", monthly_figure),
+    ("purchases_product", "📦 Product-wise Purchase Summary", product_figure),
+]
+
 st.markdown("---")
-st.markdown("###  Product-wise Purchase Summary")
-
-product_summary = filtered.groupby('product_name')['quantity_purchased'].sum().reset_index().sort_values(by='quantity_purchased', ascending=False)
-fig_product = px.bar(
-    product_summary,
-    x='product_name',
-    y='quantity_purchased',
-    title="Top Products by Purchase Volume",
-    color='quantity_purchased',
-    template='plotly_dark'
-)
-fig_product.update_layout(xaxis_title="Product", yaxis_title="Quantity", showlegend=False)
-st.plotly_chart(fig_product, use_container_width=True)
+for position, (name, label, build) in enumerate(chart_sections):
+    section = st.expander(label, expanded=position == 0, key=f"{name}_chart", on_change="rerun")
+    if not charts.is_open(section):
+        continue
+    with section:
+        timer.mark("chart")
+        fig = charts.figure(name, filter_state, build)
+        timer.mark("render")
+        st.plotly_chart(fig, use_container_width=True)
+
+perf.finish_page(timer)
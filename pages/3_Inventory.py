@@ -1,27 +1,34 @@
 import streamlit as st 
-import pandas as pd
 import plotly.express as px
-from db_connector import get_connection
+from db_connector import fetch_query
+from delta_sync import load_aggregate, load_table, table_version
+from forecast import reorder_plan
+import charts
+import perf
 
 st.set_page_config(page_title="📦 Inventory", layout="wide")
 st.title("📦 Inventory Overview")
-
-# -------------------------
-# Connect to SQL
-# -------------------------
-conn = get_connection()
+timer = perf.page_timer("Inventory")
 
 # -------------------------
 # Load data
 # -------------------------
+timer.mark("query")
 try:
-    purchases = pd.read_sql("SELECT product_id, product_name, category, quantity_purchased, cost_price FROM purchases", conn)
-    sales = pd.read_sql("SELECT product_id, quantity_sold, selling_price FROM sales", conn)
+    purchases = fetch_query("SELECT product_id, product_name, category, quantity_purchased, cost_price FROM purchases")
+    sales = load_table("sales", ['product_id', 'quantity_sold', 'selling_price', 'sales_date'])
+    # Per-product sales totals are kept up to date from deltas by delta_sync
+    sales_agg = load_aggregate("sales_by_product")
 except Exception as e:
     st.error(f"❌ Error loading data: {e}")
     st.stop()
 
+timer.add_rows(len(purchases) + len(sales))
+# Part of every chart key, so another session's upload shows up at once
+data_version = (table_version("sales"), charts.frame_version(purchases))
+
 # Normalize product_id
+timer.mark("transform")
 purchases['product_id'] = purchases['product_id'].astype(str).str.strip().str.upper()
 sales['product_id'] = sales['product_id'].astype(str).str.strip().str.upper()
 
@@ -33,10 +40,8 @@ purchase_agg = purchases.groupby(['product_id', 'product_name', 'category']).agg
     'cost_price': 'mean'
 }).reset_index()
 
-sales_agg = sales.groupby('product_id').agg({
-    'quantity_sold': 'sum',
-    'selling_price': 'mean'
-}).reset_index()
+sales_agg['selling_price'] = sales_agg['selling_price_sum'] / sales_agg['sales_count'].where(sales_agg['sales_count'] > 0)
+sales_agg = sales_agg[['product_id', 'quantity_sold', 'selling_price']]
 
 # -------------------------
 # Merge aggregated data
@@ -70,6 +75,7 @@ inventory_df.rename(columns={
 # Sidebar Filters
 # -------------------------
 st.sidebar.header("🔍 Filter Inventory")
+perf.panel_toggle()
 
 categories = inventory_df['Category'].dropna().unique()
 selected_category = st.sidebar.multiselect("Category", categories, default=list(categories))
@@ -82,6 +88,7 @@ if search_term:
 # -------------------------
 # KPI Cards
 # -------------------------
+timer.mark("render")
 st.markdown("### 📊 Inventory KPIs")
 k1, k2, k3, k4 = st.columns(4)
 k1.metric("📦 Total Live Stock", int(filtered['live_stock'].sum()))
@@ -111,45 +118,105 @@ else:
     st.success("✅ All filtered products are well stocked.")
 
 # -------------------------
-# Stock Value Visualization
+# Demand Forecast & Reorder Points
 # -------------------------
 st.markdown("---")
-st.markdown("### 💰 Stock Value by Category")
-
-category_value = filtered.groupby('Category')['stock_value'].sum().reset_index()
-fig = px.pie(category_value, names='Category', values='stock_value',
-             title="Total Inventory Value by Category", template='plotly_dark', hole=0.4)
-st.plotly_chart(fig, use_container_width=True)
+st.markdown("### 🔮 Demand Forecast & Reorder Points")
+st.caption("Daily demand is forecast per product from the last 91 days of sales "
+           "(exponential smoothing or a weekly-seasonal moving average, whichever fits best).")
 
-# -------------------------
-# Profit Opportunity Summary
-# -------------------------
-st.markdown("---")
-st.markdown("### 📈 Profit Opportunity by Product")
-
-top_n = st.slider("Top N Products by Profit", 5, 20, 10)
-top_profit = filtered.sort_values(by='total_profit', ascending=False).head(top_n)
-
-fig_profit = px.bar(top_profit, x='name', y='total_profit', color='profit_margin',
-                    title=f"Top {top_n} Products by Profit Potential",
-                    labels={'total_profit': 'Total Potential Profit', 'name': 'Product'},
-                    template='plotly_dark')
-fig_profit.update_layout(xaxis_title="Product", yaxis_title="Profit")
-st.plotly_chart(fig_profit, use_container_width=True)
+if filtered.empty:
+    st.info("ℹ️ No products match the current filters.")
+else:
+    f1, f2, f3 = st.columns(3)
+    lead_time = f1.number_input("Supplier Lead Time (days)", min_value=1, max_value=120, value=7)
+    review_days = f2.number_input("Days Covered per Order", min_value=1, max_value=120, value=7)
+    service_level = f3.slider("Service Level", 0.80, 0.99, 0.95)
+
+    timer.mark("transform")
+    plan = reorder_plan(
+        sales[sales['product_id'].isin(filtered['product_id'])],
+        filtered.set_index('product_id')['live_stock'],
+        lead_time_days=lead_time,
+        review_days=review_days,
+        service_level=service_level
+    )
+    plan = plan.merge(filtered[['product_id', 'name', 'Category']], on='product_id', how='left')
+    to_reorder = plan[plan['reorder_now']].sort_values(by='order_quantity', ascending=False)
+    timer.add_rows(len(plan))
+
+    timer.mark("render")
+    if not to_reorder.empty:
+        st.warning(f"🛒 {len(to_reorder)} product(s) are at or below their reorder point.")
+    else:
+        st.success("✅ No product needs reordering yet.")
+    st.dataframe(
+        to_reorder[['product_id', 'name', 'Category', 'live_stock', 'daily_forecast',
+                    'reorder_point', 'order_quantity', 'model']].round(2),
+        use_container_width=True
+    )
+
+# -------------------------
+# Charts — each section builds its figure only while expanded, and figures
+# are memoized on the data version, the sidebar filters and the section's
+# own slider
+# -------------------------
+filter_state = (data_version, tuple(selected_category), search_term)
 
-# -------------------------
-# Stock Distribution by Product
-# -------------------------
 st.markdown("---")
-st.markdown("### 📦 Stock Distribution by Product")
-
-top_stock = st.slider("Top N Products by Stock", 5, 20, 10)
-stock_bar = px.bar(
-    filtered.sort_values(by='live_stock', ascending=False).head(top_stock),
-    x='name', y='live_stock',
-    title=f"Top {top_stock} Products by Live Stock",
-    color='live_stock',
-    template='plotly_dark'
-)
-stock_bar.update_layout(xaxis_title="Product", yaxis_title="Live Stock", showlegend=False)
-st.plotly_chart(stock_bar, use_container_width=True)
+value_section = st.expander("💰 Stock Value by Category", expanded=True,
+                            key="inventory_value_chart", on_change="rerun")
+if charts.is_open(value_section):
+    with value_section:
+        timer.mark("chart")
+        fig = charts.figure("inventory_value", filter_state, lambda: px.pie(
+            filtered.groupby('Category')['stock_value'].sum().reset_index(),
+            names='Category', values='stock_value',
+            title="Total Inventory Value by Category", template='plotly_dark', hole=0.4
+        ))
+        timer.mark("render")
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def profit_figure(top_n):
+    top_profit = filtered.sort_values(by='total_profit', ascending=False).head(top_n)
+    fig_profit = px.bar(top_profit, x='name', y='total_profit', color='profit_margin',
+                        title=f"Top {top_n} Products by Profit Potential",
+                        labels={'total_profit': 'Total Potential Profit', 'name': 'Product'},
+                        template='plotly_dark')
+    fig_profit.update_layout(xaxis_title="Product", yaxis_title="Profit")
+    return fig_profit
+
+
+profit_section = st.expander("📈 Profit Opportunity by Product", key="inventory_profit_chart", on_change="rerun")
+if charts.is_open(profit_section):
+    with profit_section:
+        top_n = st.slider("Top N Products by Profit", 5, 20, 10)
+        timer.mark("chart")
+        fig_profit = charts.figure("inventory_profit", filter_state + (top_n,), lambda: profit_figure(top_n))
+        timer.mark("render")
+        st.plotly_chart(fig_profit, use_container_width=True)
+
+
+def stock_figure(top_stock):
+    stock_bar = px.bar(
+        filtered.sort_values(by='live_stock', ascending=False).head(top_stock),
+        x='name', y='live_stock',
+        title=f"Top {top_stock} Products by Live Stock",
+        color='live_stock',
+        template='plotly_dark'
+    )
+    stock_bar.update_layout(xaxis_title="Product", yaxis_title="Live Stock", showlegend=False)
+    return stock_bar
+
+
+stock_section = st.expander("📦 Stock Distribution by Product", key="inventory_stock_chart", on_change="rerun")
+if charts.is_open(stock_section):
+    with stock_section:
+        top_stock = st.slider("Top N Products by Stock", 5, 20, 10)
+        timer.mark("chart")
+        stock_bar = charts.figure("inventory_stock", filter_state + (top_stock,), lambda: stock_figure(top_stock))
+        timer.mark("render")
+        st.plotly_chart(stock_bar, use_container_width=True)
+
+perf.finish_page(timer)
@@ -1,30 +1,54 @@
 import streamlit as st 
 import pandas as pd
 import plotly.express as px
-from db_connector import get_connection
+from db_connector import fetch_query
+from delta_sync import load_table, table_version
+from export import export_panel, sales_export_query
+import charts
+import perf
 
 st.set_page_config(page_title="📈 Sales", layout="wide")
 st.title("📈 Sales Overview")
+timer = perf.page_timer("Sales")
 
 # -------------------------
-# Connect to MySQL
+# Date range first: sales is partitioned by month on sales_date (see
+# partitions.py), and comparing the bare column lets MySQL read only the
+# partitions the range covers instead of all of history.
 # -------------------------
-conn = get_connection()
+@st.cache_data(ttl=300)
+def sales_date_bounds():
+    bounds = fetch_query("SELECT MIN(sales_date) AS first, MAX(sales_date) AS last FROM sales")
+    return bounds.iloc[0]['first'], bounds.iloc[0]['last']
+
+
+st.sidebar.header("🔍 Filter Sales")
+timer.mark("query")
+first_date, last_date = sales_date_bounds()
+start_date = st.sidebar.date_input("Start Date", value=first_date)
+end_date = st.sidebar.date_input("End Date", value=last_date)
 
 # -------------------------
 # Load raw tables
 # -------------------------
 try:
-    sales = pd.read_sql("SELECT * FROM sales", conn)
-    products = pd.read_sql("SELECT * FROM product", conn)
-    purchases = pd.read_sql("SELECT product_id, product_name AS product_name_purchases, cost_price FROM purchases", conn)
+    sales = fetch_query(
+        "SELECT * FROM sales WHERE sales_date BETWEEN %s AND %s", (start_date, end_date)
+    ).drop(columns='updated_at', errors='ignore')
+    products = load_table("product")
+    purchases = fetch_query("SELECT product_id, product_name AS product_name_purchases, cost_price FROM purchases")
 except Exception as e:
     st.error(f"❌ Error loading data: {e}")
     st.stop()
 
+timer.add_rows(len(sales) + len(products) + len(purchases))
+# Part of every chart key, so another session's upload shows up at once
+data_version = (charts.frame_version(sales, purchases), table_version("product"))
+
 # -------------------------
 # Normalize product_id across all tables
 # -------------------------
+timer.mark("transform")
 sales['product_id'] = sales['product_id'].astype(str).str.strip().str.upper()
 products['product_id'] = products['product_id'].astype(str).str.strip().str.upper()
 purchases['product_id'] = purchases['product_id'].astype(str).str.strip().str.upper()
@@ -41,7 +65,9 @@ sales['product_name'] = sales['product_name'].fillna(sales['product_name_purchas
 # -------------------------
 # DEBUG: Show raw data
 # -------------------------
-if st.sidebar.checkbox("Show Raw Data", key="debug"):
+show_raw = st.sidebar.checkbox("Show Raw Data", key="debug")
+perf.panel_toggle()
+if show_raw:
     st.subheader("🔍 Raw Sales Data")
     st.write("Sales Table", sales)
     st.write("Products Table", products)
@@ -72,31 +98,26 @@ sales['profit'] = sales['quantity_sold'] * (sales['selling_price'] - sales['cost
 # -------------------------
 # Filter Section
 # -------------------------
-st.sidebar.header("🔍 Filter Sales")
-
 all_products = sales['product_name'].dropna().unique()
 product_filter = st.sidebar.multiselect("Product Name", all_products, default=list(all_products))
 
 shipped_filter = st.sidebar.selectbox("Shipped Status", ["All"] + sales['shipped_status'].dropna().unique().tolist())
 payment_filter = st.sidebar.selectbox("Payment Status", ["All"] + sales['payment_status'].dropna().unique().tolist())
 
-start_date = st.sidebar.date_input("Start Date", value=sales['sales_date'].min())
-end_date = st.sidebar.date_input("End Date", value=sales['sales_date'].max())
-
 # -------------------------
 # Apply Filters
 # -------------------------
-filtered_sales = sales[
-    (sales['product_name'].isin(product_filter)) &
-    (sales['sales_date'] >= pd.to_datetime(start_date)) &
-    (sales['sales_date'] <= pd.to_datetime(end_date))
-]
+timer.mark("transform")
+filtered_sales = sales[sales['product_name'].isin(product_filter)]
 
 if shipped_filter != "All":
     filtered_sales = filtered_sales[filtered_sales['shipped_status'] == shipped_filter]
 
 if payment_filter != "All":
     filtered_sales = filtered_sales[filtered_sales['payment_status'] == payment_filter]
+timer.add_rows(len(sales))
+
+timer.mark("render")
 
 # -------------------------
 # KPI Metrics
@@ -120,6 +141,9 @@ else:
         filtered_sales[['sale_id', 'sales_date', 'product_name', 'quantity_sold', 'revenue', 'profit', 'shipped_status', 'payment_status']],
         use_container_width=True
     )
+    export_panel("sales", *sales_export_query(
+        product_filter, all_products, shipped_filter, payment_filter, start_date, end_date
+    ))
 
 # -------------------------
 # Top Products Section
@@ -127,37 +151,50 @@ else:
 st.markdown("---")
 st.markdown("### 🏆 Top-Selling Products")
 
+# Figures are memoized on the data version and the filters (charts.figure),
+# so a rerun that changes none of them skips the aggregation and the Plotly
+# build.
+filter_state = (data_version, start_date, end_date, tuple(product_filter), shipped_filter, payment_filter)
+
 top_n = st.slider("Top N Products", 5, 20, 10)
-top_products = filtered_sales.groupby('product_name').agg({
-    'quantity_sold': 'sum',
-    'revenue': 'sum',
-    'profit': 'sum'
-}).sort_values(by='quantity_sold', ascending=False).reset_index().head(top_n)
+
+
+def top_products():
+    return filtered_sales.groupby('product_name').agg({
+        'quantity_sold': 'sum',
+        'revenue': 'sum',
+        'profit': 'sum'
+    }).sort_values(by='quantity_sold', ascending=False).reset_index().head(top_n)
+
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig1 = px.bar(
-        top_products,
+    timer.mark("chart")
+    fig1 = charts.figure("sales_top_quantity", filter_state + (top_n,), lambda: px.bar(
+        top_products(),
         x='product_name',
         y='quantity_sold',
         title=f"Top {top_n} Products by Quantity",
         color='quantity_sold',
         template='plotly_dark',
         animation_frame=None
-    )
+    ))
+    timer.mark("render")
     st.plotly_chart(fig1, use_container_width=True)
 
 with col2:
-    fig2 = px.bar(
-        top_products,
+    timer.mark("chart")
+    fig2 = charts.figure("sales_top_revenue", filter_state + (top_n,), lambda: px.bar(
+        top_products(),
         x='product_name',
         y='revenue',
         title=f"Top {top_n} Products by Revenue",
         color='revenue',
         template='plotly_dark',
         animation_frame=None
-    )
+    ))
+    timer.mark("render")
     st.plotly_chart(fig2, use_container_width=True)
 
 # -------------------------
@@ -166,44 +203,42 @@ with col2:
 st.markdown("---")
 st.markdown("### 📆 Monthly Sales Performance")
 
-sales_monthly = filtered_sales.copy()
-sales_monthly['month'] = sales_monthly['sales_date'].dt.to_period('M').astype(str)
-monthly_grouped = sales_monthly.groupby('month')[['quantity_sold', 'revenue', 'profit']].sum().reset_index()
 
-tab1, tab2, tab3 = st.tabs(["📦 Quantity", "💰 Revenue", "📈 Profit"])
+def monthly_grouped():
+    sales_monthly = filtered_sales.copy()
+    sales_monthly['month'] = sales_monthly['sales_date'].dt.to_period('M').astype(str)
+    return sales_monthly.groupby('month')[['quantity_sold', 'revenue', 'profit']].sum().reset_index()
 
-with tab1:
-    fig3 = px.line(
-        monthly_grouped,
-        x='month',
-        y='quantity_sold',
-        title="Monthly Units Sold",
-        markers=True,
-        template='plotly_dark',
-        animation_frame=None
-    )
-    st.plotly_chart(fig3, use_container_width=True)
 
-with tab2:
-    fig4 = px.line(
-        monthly_grouped,
+def monthly_line(column, title):
+    return px.line(
+        monthly_grouped(),
         x='month',
-        y='revenue',
-        title="Monthly Revenue",
+        y=column,
+        title=title,
         markers=True,
         template='plotly_dark',
         animation_frame=None
     )
-    st.plotly_chart(fig4, use_container_width=True)
 
-with tab3:
-    fig5 = px.line(
-        monthly_grouped,
-        x='month',
-        y='profit',
-        title="Monthly Profit",
-        markers=True,
-        template='plotly_dark',
-        animation_frame=None
-    )
-    st.plotly_chart(fig5, use_container_width=True)
+
+# on_change="rerun" makes each tab report whether it is open, so only the
+# selected tab builds its chart
+monthly_tabs = st.tabs(["📦 Quantity", "💰 Revenue", "📈 Profit"], key="sales_monthly_tab", on_change="rerun")
+monthly_charts = [
+    ("quantity_sold", "Monthly Units Sold"),
+    ("revenue", "Monthly Revenue"),
+    ("profit", "Monthly Profit"),
+]
+
+for tab, (column, title) in zip(monthly_tabs, monthly_charts):
+    if not charts.is_open(tab):
+        continue
+    with tab:
+        timer.mark("chart")
+        fig = charts.figure(f"sales_monthly_{column}", filter_state,
+                            lambda column=column, title=title: monthly_line(column, title))
+        timer.mark("render")
+        st.plotly_chart(fig, use_container_width=True)
+
+perf.finish_page(timer)
@@ -0,0 +1,63 @@
+import streamlit as st
+import pandas as pd
+from db_connector import query_log_settings, clear_slow_queries, dump_slow_queries, slow_queries
+
+st.set_page_config(page_title="🐢 Slow Queries", layout="wide")
+st.title("🐢 Slow Query Log")
+
+settings = query_log_settings()
+st.caption(
+    f"Statements slower than {settings['slow_ms']:,.0f} ms are kept here (last {settings['size']}). "
+    "Set `slow_ms` and `size` under `[query_log]` in secrets to change this."
+)
+
+entries = slow_queries()
+
+# -------------------------
+# Actions
+# -------------------------
+col1, col2 = st.columns(2)
+with col1:
+    st.download_button(
+        "⬇️ Download as JSON",
+        dump_slow_queries(),
+        file_name="slow_queries.json",
+        mime="application/json"
+    )
+with col2:
+    if st.button("🗑️ Clear Log"):
+        clear_slow_queries()
+        st.rerun()
+
+if not entries:
+    st.success("✅ No slow queries recorded yet.")
+    st.stop()
+
+# -------------------------
+# Summary Table
+# -------------------------
+summary = pd.DataFrame([
+    {
+        "time": pd.to_datetime(entry["ts"], unit="s"),
+        "ms": entry["ms"],
+        "host": entry.get("host"),
+        "rows": entry["rows"],
+        "statement": entry["statement"],
+    }
+    for entry in reversed(entries)
+])
+st.dataframe(summary, use_container_width=True)
+
+# -------------------------
+# Details with EXPLAIN
+# -------------------------
+st.markdown("### 🔍 Details")
+for entry in reversed(entries):
+    with st.expander(f"{entry['ms']:,.0f} ms — {entry['statement'][:100]}"):
+        st.code(entry["statement"], language="sql")
+        if entry["params"]:
+            st.write("Parameters:", entry["params"])
+        if isinstance(entry["explain"], list):
+            st.dataframe(pd.DataFrame(entry["explain"]), use_container_width=True)
+        elif entry["explain"]:
+            st.warning(entry["explain"])
@@ -0,0 +1,244 @@
+# Monthly RANGE partitioning for sales and purchases.
+#
+#   python partitions.py init        # partition both tables (one-off, rebuilds them)
+#   python partitions.py maintain    # add upcoming months, archive old ones
+#   python partitions.py benchmark   # one-month query vs full scan
+#
+# MySQL requires the partitioning column in every PRIMARY/UNIQUE key and does
+# not allow foreign keys on partitioned InnoDB tables; `init` extends the
+# primary key with the date column (e.g. sale_id -> (sale_id, sales_date)).
+# That key no longer stops two sales sharing a sale_id, so `init` also copies
+# the ids into an unpartitioned <table>_keys table keyed on the id alone, and
+# ingest.py inserts every new id there in the same transaction as the row.
+import sys
+import time
+
+import pandas as pd
+
+# table -> date column it is partitioned on
+PARTITIONED = {
+    "sales": "sales_date",
+    "purchases": "order_date",
+}
+
+# Ids that must stay unique on their own once the date joins the primary key
+UNIQUE_KEYS = {
+    "sales": "sale_id",
+}
+
+# Partitions created ahead of the current month by `maintain`
+MONTHS_AHEAD = 3
+
+# Months kept in the live tables; older partitions move to <table>_archive
+RETAIN_MONTHS = 24
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def _month_start(value):
+    return pd.Timestamp(value).to_period("M").to_timestamp()
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def _partition_clause(month):
+    upper = month + pd.DateOffset(months=1)
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{upper:%Y-%m-%d}')"
+
+
+def _months(first, last):
+    return list(pd.date_range(_month_start(first), _month_start(last), freq="MS"))
+
+
+def existing_partitions(cursor, table):
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+    return cursor.fetchall()
+
+
+def key_table(table):
+    return f"{table}_keys"
+
+
+def _primary_key(cursor, table):
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY'
+        ORDER BY ORDINAL_POSITION
+    """, (table,))
+    return [column for (column,) in cursor.fetchall()]
+
+
+# -------------------------
+# Partition management
+# -------------------------
+def create_key_table(cursor, table):
+    """Copy the ids of `table` into <table>_keys, where they are the primary key.
+
+    Archived rows keep their ids there, so an archived sale_id is not reused.
+    """
+    key = UNIQUE_KEYS[table]
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {key_table(table)} (PRIMARY KEY ({key})) "
+        f"SELECT {key} FROM {table}"
+    )
+
+
+def partition_table(cursor, table):
+    """Rebuild `table` with one partition per month of its data plus pmax."""
+    column = PARTITIONED[table]
+    if table in UNIQUE_KEYS:
+        create_key_table(cursor, table)
+    if existing_partitions(cursor, table):
+        return False
+
+    key = _primary_key(cursor, table)
+    if key and column not in key:
+        cursor.execute(
+            f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY ({', '.join(key + [column])})"
+        )
+
+    cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM {table}")
+    first, last = cursor.fetchone()
+    today = pd.Timestamp.today()
+    months = _months(first or today, max(pd.Timestamp(last or today), today) + pd.DateOffset(months=MONTHS_AHEAD))
+    partitions = [_partition_clause(month) for month in months]
+    partitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    cursor.execute(
+        f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS({column}) ({', '.join(partitions)})"
+    )
+    return True
+
+
+def add_future_partitions(cursor, table, months_ahead=MONTHS_AHEAD):
+    """Split pmax so every month up to `months_ahead` from now has its own partition.
+
+    Raises ValueError if `table` isn't partitioned yet.
+    """
+    names = {name for name, _, _ in existing_partitions(cursor, table)}
+    if not names:
+        # REORGANIZE on a plain table only gives an obscure MySQL error
+        raise ValueError(f"{table} is not partitioned; run `python partitions.py init` first.")
+    target = pd.Timestamp.today() + pd.DateOffset(months=months_ahead)
+    newest = max(
+        (pd.Timestamp(f"{name[1:5]}-{name[5:7]}-01") for name in names if name != "pmax"),
+        default=_month_start(pd.Timestamp.today()) - pd.DateOffset(months=1)
+    )
+    months = [m for m in _months(newest + pd.DateOffset(months=1), target) if partition_name(m) not in names]
+    if not months:
+        return []
+    clauses = [_partition_clause(month) for month in months]
+    clauses.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({', '.join(clauses)})")
+    return [partition_name(month) for month in months]
+
+
+def archive_old_partitions(cursor, table, retain_months=RETAIN_MONTHS):
+    """Move partitions older than `retain_months` into a compressed <table>_archive."""
+    archive = f"{table}_archive"
+    cutoff = _month_start(pd.Timestamp.today()) - pd.DateOffset(months=retain_months)
+    old = [
+        name for name, _, _ in existing_partitions(cursor, table)
+        if name != "pmax" and pd.Timestamp(f"{name[1:5]}-{name[5:7]}-01") < cutoff
+    ]
+    if not old:
+        return []
+
+    cursor.execute("""
+        SELECT 1 FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (archive,))
+    if not cursor.fetchone():
+        # Same columns, no partitioning, InnoDB page compression for cold rows
+        cursor.execute(f"CREATE TABLE {archive} LIKE {table}")
+        cursor.execute(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {archive} ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8")
+    for name in old:
+        cursor.execute(f"INSERT IGNORE INTO {archive} SELECT * FROM {table} PARTITION ({name})")
+        cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+    return old
+
+
+# -------------------------
+# Benchmark
+# -------------------------
+def _explain_scan(cursor, sql, params=()):
+    cursor.execute(f"EXPLAIN {sql}", params)
+    columns = [desc[0] for desc in cursor.description]
+    plan = [dict(zip(columns, row)) for row in cursor.fetchall()][0]
+    partitions = plan.get("partitions") or ""
+    return len([p for p in partitions.split(",") if p]), plan.get("rows")
+
+
+def benchmark(cursor):
+    """Partitions and estimated rows for a full scan vs the latest month."""
+    results = []
+    for table, column in PARTITIONED.items():
+        cursor.execute(f"SELECT MAX({column}) FROM {table}")
+        (last,) = cursor.fetchone()
+        if last is None:
+            continue
+        start = _month_start(last)
+        end = start + pd.DateOffset(months=1) - pd.Timedelta(days=1)
+
+        full_sql = f"SELECT * FROM {table}"
+        month_sql = f"SELECT * FROM {table} WHERE {column} BETWEEN %s AND %s"
+        month_params = (start.date(), end.date())
+
+        timings = {}
+        for label, sql, params in [("full", full_sql, ()), ("month", month_sql, month_params)]:
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            rows = len(cursor.fetchall())
+            timings[label] = (time.perf_counter() - started, rows)
+
+        full_parts, full_est = _explain_scan(cursor, full_sql)
+        month_parts, month_est = _explain_scan(cursor, month_sql, month_params)
+        results.append({
+            "table": table,
+            "partitions_full": full_parts,
+            "partitions_month": month_parts,
+            "rows_examined_full": full_est,
+            "rows_examined_month": month_est,
+            "seconds_full": round(timings["full"][0], 4),
+            "seconds_month": round(timings["month"][0], 4),
+            "rows_returned_month": timings["month"][1],
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    from db_connector import get_connection
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "maintain"
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    failed = False
+    try:
+        for table in PARTITIONED:
+            if command == "init":
+                done = partition_table(cursor, table)
+                print(f"✅ {table}: partitioned by month." if done else f"ℹ️ {table}: already partitioned.")
+            elif command == "maintain":
+                try:
+                    added = add_future_partitions(cursor, table)
+                except ValueError as e:
+                    print(f"❌ {e}")
+                    failed = True
+                    continue
+                archived = archive_old_partitions(cursor, table)
+                print(f"✅ {table}: added {added or 'none'}, archived {archived or 'none'}.")
+        if command == "benchmark":
+            print(benchmark(cursor).to_string(index=False))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,85 @@
+import streamlit as st
+from db_connector import fetch_query
+
+# A line still owes money unless it is paid, as the alerts always counted
+# it; the default collation is case-insensitive, so 'paid' and 'PAID' are
+# settled too. MySQL reads the two ranges either side of 'Paid' from the
+# (payment_status, payment_due_date) index.
+OPEN_CLAUSE = "payment_status <> 'Paid'"
+
+# Days past due; lines without a due date can't be aged and get their own
+# bucket, so the buckets always add up to total_due
+OVERDUE_BUCKETS = ["1-30", "31-60", "61-90", "90+"]
+AGING_BUCKETS = ["Current"] + OVERDUE_BUCKETS + ["No due date"]
+
+# Vendor totals change only when purchases are uploaded or paid
+CACHE_TTL = 300
+
+
+def _filters(where, params):
+    # `where`/`params` are the page's sidebar filters (export.purchases_filter)
+    return f"{OPEN_CLAUSE} AND {where}", list(params)
+
+
+# -------------------------
+# Aging per vendor
+# -------------------------
+@st.cache_data(ttl=CACHE_TTL)
+def aging_by_vendor(where="TRUE", params=()):
+    where, params = _filters(where, params)
+    aging = fetch_query(f"""
+        SELECT vendor_name,
+            SUM(CASE WHEN payment_due_date >= CURDATE() THEN quantity_purchased * cost_price ELSE 0 END) AS `Current`,
+            SUM(CASE WHEN DATEDIFF(CURDATE(), payment_due_date) BETWEEN 1 AND 30 THEN quantity_purchased * cost_price ELSE 0 END) AS `1-30`,
+            SUM(CASE WHEN DATEDIFF(CURDATE(), payment_due_date) BETWEEN 31 AND 60 THEN quantity_purchased * cost_price ELSE 0 END) AS `31-60`,
+            SUM(CASE WHEN DATEDIFF(CURDATE(), payment_due_date) BETWEEN 61 AND 90 THEN quantity_purchased * cost_price ELSE 0 END) AS `61-90`,
+            SUM(CASE WHEN DATEDIFF(CURDATE(), payment_due_date) > 90 THEN quantity_purchased * cost_price ELSE 0 END) AS `90+`,
+            SUM(CASE WHEN payment_due_date IS NULL THEN quantity_purchased * cost_price ELSE 0 END) AS `No due date`,
+            SUM(quantity_purchased * cost_price) AS total_due,
+            COALESCE(SUM(payment_due_date < CURDATE()), 0) AS overdue_lines,
+            COUNT(*) AS open_lines
+        FROM purchases
+        WHERE {where}
+        GROUP BY vendor_name
+        ORDER BY total_due DESC
+    """, tuple(params))
+    # SUM() over DECIMAL columns comes back as Decimal objects
+    return aging.astype({col: float for col in AGING_BUCKETS + ['total_due']}).astype(
+        {'overdue_lines': int, 'open_lines': int})
+
+
+# -------------------------
+# Upcoming due dates
+# -------------------------
+@st.cache_data(ttl=CACHE_TTL)
+def upcoming_due(days=30, where="TRUE", params=()):
+    where, params = _filters(where, params)
+    upcoming = fetch_query(f"""
+        SELECT payment_due_date, vendor_name,
+            SUM(quantity_purchased * cost_price) AS amount_due,
+            COUNT(*) AS lines
+        FROM purchases
+        WHERE {where}
+            AND payment_due_date BETWEEN CURDATE() AND CURDATE() + INTERVAL %s DAY
+        GROUP BY payment_due_date, vendor_name
+        ORDER BY payment_due_date
+    """, tuple(params + [int(days)]))
+    return upcoming.astype({'amount_due': float})
+
+
+# -------------------------
+# Most overdue lines
+# -------------------------
+@st.cache_data(ttl=CACHE_TTL)
+def most_overdue(limit=100, where="TRUE", params=()):
+    where, params = _filters(where, params)
+    overdue = fetch_query(f"""
+        SELECT vendor_name, product_name, payment_due_date,
+            DATEDIFF(CURDATE(), payment_due_date) AS days_overdue,
+            quantity_purchased * cost_price AS amount_due
+        FROM purchases
+        WHERE {where} AND payment_due_date < CURDATE()
+        ORDER BY payment_due_date
+        LIMIT %s
+    """, tuple(params + [int(limit)]))
+    return overdue.astype({'amount_due': float})
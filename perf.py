@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import defaultdict
+
+import streamlit as st
+
+PHASES = ["query", "transform", "chart", "render"]
+
+
+# -------------------------
+# Settings from the optional [perf] secrets section
+# -------------------------
+def _settings():
+    try:
+        perf = st.secrets.get("perf", {})
+    except FileNotFoundError:
+        perf = {}
+    return {
+        "metrics_log": perf.get("metrics_log", "perf_metrics.jsonl"),
+        "prometheus_file": perf.get("prometheus_file", "perf_metrics.prom"),
+    }
+
+
+# ✅ Shared across sessions so the Prometheus file reflects every page run
+@st.cache_resource
+def _prometheus_state():
+    return {
+        "lock": threading.Lock(),
+        "runs": defaultdict(int),
+        "seconds_total": defaultdict(float),
+        "last": {},
+        # Page runs currently tracing memory, and whether the first of them
+        # started tracemalloc (so the last one out should stop it)
+        "tracers": 0,
+        "own_tracer": False,
+    }
+
+
+def _acquire_tracer():
+    state = _prometheus_state()
+    with state["lock"]:
+        if state["tracers"] == 0:
+            state["own_tracer"] = not tracemalloc.is_tracing()
+            if state["own_tracer"]:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        state["tracers"] += 1
+
+
+def _release_tracer():
+    # Returns the peak seen since the first of the overlapping runs started
+    state = _prometheus_state()
+    with state["lock"]:
+        peak = tracemalloc.get_traced_memory()[1]
+        state["tracers"] -= 1
+        if state["tracers"] == 0 and state["own_tracer"]:
+            tracemalloc.stop()
+    return peak
+
+
+# -------------------------
+# Page timer
+# -------------------------
+class PageTimer:
+    def __init__(self, page, started=None):
+        self.page = page
+        self.seconds = defaultdict(float)
+        self.rows = defaultdict(int)
+        self.started = time.perf_counter()
+        self.current, self.mark_time = None, self.started
+        if started is not None:
+            # Time before the timer existed (e.g. the page's imports)
+            self.seconds["import"] += self.started - started
+            self.started = started
+        # tracemalloc slows every allocation, so peak memory is only traced
+        # while the debug panel is open. The tracer is process-wide and
+        # reference counted: it runs until the last overlapping run is done,
+        # and the figure includes any other session running at the same time.
+        # A run that ends early (st.stop) releases it when the timer is freed.
+        self.trace_memory = st.session_state.get("perf_panel", False)
+        self._release_tracer = None
+        if self.trace_memory:
+            _acquire_tracer()
+            self._release_tracer = weakref.finalize(self, _release_tracer)
+
+    def mark(self, name):
+        # Close the running phase and start `name`; time always belongs to
+        # whichever phase was marked last, so flat page scripts only need a
+        # one-line mark before each block.
+        now = time.perf_counter()
+        if self.current is not None:
+            self.seconds[self.current] += now - self.mark_time
+        self.current, self.mark_time = name, now
+
+    def add_rows(self, rows, name=None):
+        self.rows[name or self.current] += int(rows)
+
+    def finish(self):
+        self.mark(None)
+        peak = None
+        if self._release_tracer is not None:
+            peak = self._release_tracer()
+        return {
+            "ts": time.time(),
+            "page": self.page,
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "phases": {name: round(value, 6) for name, value in self.seconds.items()},
+            "rows": dict(self.rows),
+            "peak_memory_bytes": peak,
+        }
+
+
+def page_timer(page, started=None):
+    return PageTimer(page, started)
+
+
+def panel_toggle():
+    return st.sidebar.checkbox("Show Performance", key="perf_panel")
+
+
+# -------------------------
+# Sinks
+# -------------------------
+def _append_log(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def _write_prometheus(path, record):
+    state = _prometheus_state()
+    with state["lock"]:
+        page = record["page"]
+        state["runs"][page] += 1
+        for phase, seconds in record["phases"].items():
+            state["seconds_total"][(page, phase)] += seconds
+        state["last"][page] = record
+
+        lines = [
+            "# HELP retail_page_runs_total Dashboard script runs.",
+            "# TYPE retail_page_runs_total counter",
+        ]
+        lines += [f'retail_page_runs_total{{page="{p}"}} {n}' for p, n in sorted(state["runs"].items())]
+        lines += [
+            "# HELP retail_page_phase_seconds_total Time spent per page phase.",
+            "# TYPE retail_page_phase_seconds_total counter",
+        ]
+        lines += [
+            f'retail_page_phase_seconds_total{{page="{p}",phase="{ph}"}} {s:.6f}'
+            for (p, ph), s in sorted(state["seconds_total"].items())
+        ]
+        lines += [
+            "# HELP retail_page_last_seconds Duration of the most recent run.",
+            "# TYPE retail_page_last_seconds gauge",
+        ]
+        lines += [f'retail_page_last_seconds{{page="{p}"}} {r["total_seconds"]:.6f}' for p, r in sorted(state["last"].items())]
+        lines += [
+            "# HELP retail_page_last_rows Rows processed by the most recent run.",
+            "# TYPE retail_page_last_rows gauge",
+        ]
+        lines += [
+            f'retail_page_last_rows{{page="{p}",phase="{ph}"}} {n}'
+            for p, r in sorted(state["last"].items()) for ph, n in sorted(r["rows"].items())
+        ]
+        lines += [
+            "# HELP retail_page_last_peak_memory_bytes Peak traced memory of the most recent run.",
+            "# TYPE retail_page_last_peak_memory_bytes gauge",
+        ]
+        lines += [
+            f'retail_page_last_peak_memory_bytes{{page="{p}"}} {r["peak_memory_bytes"]}'
+            for p, r in sorted(state["last"].items()) if r["peak_memory_bytes"] is not None
+        ]
+        lines += [
+            "# HELP retail_page_over_budget 1 if the most recent run exceeded its time budget.",
+            "# TYPE retail_page_over_budget gauge",
+        ]
+        lines += [
+            f'retail_page_over_budget{{page="{p}"}} {int(r["over_budget"])}'
+            for p, r in sorted(state["last"].items()) if "over_budget" in r
+        ]
+
+        # Write-then-rename so a scraper never reads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+
+def _render_panel(record):
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.metric("Total", f"{record['total_seconds'] * 1000:,.0f} ms")
+        if record.get("over_budget"):
+            st.error(f"Over the {record['budget_ms']:,} ms budget")
+        for phase in PHASES + sorted(set(record["phases"]) - set(PHASES)):
+            if phase in record["phases"]:
+                rows = record["rows"].get(phase)
+                suffix = f" · {rows:,} rows" if rows else ""
+                st.write(f"**{phase}**: {record['phases'][phase] * 1000:,.1f} ms{suffix}")
+        if record["peak_memory_bytes"] is not None:
+            st.write(f"**peak memory**: {record['peak_memory_bytes'] / 1024 ** 2:,.1f} MiB")
+
+
+def finish_page(timer, budget_ms=None):
+    record = timer.finish()
+    if budget_ms is not None:
+        record["budget_ms"] = budget_ms
+        record["over_budget"] = record["total_seconds"] * 1000 > budget_ms
+    settings = _settings()
+    try:
+        if settings["metrics_log"]:
+            _append_log(settings["metrics_log"], record)
+        if settings["prometheus_file"]:
+            _write_prometheus(settings["prometheus_file"], record)
+    except OSError as e:
+        st.sidebar.caption(f"⚠️ Couldn't write performance metrics: {e}")
+    if st.session_state.get("perf_panel"):
+        _render_panel(record)
+    return record
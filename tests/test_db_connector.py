@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import pymysql
+import pytest
+from mysql.connector.errors import PoolError
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db_connector  # noqa: E402
+
+
+def _failing_read(failures):
+    def read_sql(query, engine, params=None):
+        if engine in failures:
+            raise OperationalError(query, params, failures[engine])
+        return engine
+    return read_sql
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    marked = []
+    monkeypatch.setattr(db_connector, "_read_engines", lambda: ["replica", "primary"])
+    monkeypatch.setattr(db_connector, "_mark_down", marked.append)
+    return marked
+
+
+def test_lost_replica_is_marked_down_and_skipped(monkeypatch, routing):
+    lost = pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+    monkeypatch.setattr(db_connector.pd, "read_sql", _failing_read({"replica": lost}))
+
+    assert db_connector.fetch_query("SELECT 1") == "primary"
+    assert routing == ["replica"]
+
+
+def test_query_errors_are_raised_without_marking_down(monkeypatch, routing):
+    lock_wait = pymysql.err.OperationalError(1205, "Lock wait timeout exceeded")
+    monkeypatch.setattr(db_connector.pd, "read_sql", _failing_read({"replica": lock_wait}))
+
+    with pytest.raises(OperationalError):
+        db_connector.fetch_query("SELECT 1")
+    assert routing == []
+
+
+class BusyPool:
+    def __init__(self, busy_for):
+        self.busy_for = busy_for
+
+    def get_connection(self):
+        if self.busy_for:
+            self.busy_for -= 1
+            raise PoolError("Failed getting connection; pool exhausted")
+        return "connection"
+
+
+def test_checkout_waits_for_a_connection_to_free_up(monkeypatch):
+    monkeypatch.setattr(db_connector.time, "sleep", lambda seconds: None)
+    assert db_connector._checkout(BusyPool(busy_for=3), wait=10) == "connection"
+
+
+def test_checkout_gives_up_after_the_wait():
+    with pytest.raises(PoolError):
+        db_connector._checkout(BusyPool(busy_for=1000), wait=0.2)
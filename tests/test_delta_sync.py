@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import delta_sync  # noqa: E402
+
+COLUMNS = ["product_id", "product_name", "category", "stock", "updated_at"]
+
+
+def _product(stock):
+    return pd.DataFrame([["P1", "Widget", "Tools", stock, pd.Timestamp("2024-01-05 10:00")]],
+                        columns=COLUMNS)
+
+
+def _sync(monkeypatch, rows):
+    monkeypatch.setattr(delta_sync, "fetch_query", lambda query, params=None: rows)
+    state = delta_sync._state()["product"]
+    state["synced_at"] = 0.0
+    delta_sync._sync("product", state)
+    return state["version"]
+
+
+def test_table_version_changes_only_with_the_data(monkeypatch):
+    delta_sync._state.clear()
+    loaded = _sync(monkeypatch, _product(5))
+
+    # The updated_at overlap re-reads the same row: nothing new to draw
+    assert _sync(monkeypatch, _product(5)) == loaded
+    assert _sync(monkeypatch, _product(7)) == loaded + 1
+    assert delta_sync.table_version("product") == loaded + 1
@@ -0,0 +1,43 @@
+import datetime
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+from pymysql.constants import FIELD_TYPE
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from export import _write_parquet  # noqa: E402
+
+COLUMN_TYPES = {
+    "sale_id": FIELD_TYPE.LONG,
+    "sales_date": FIELD_TYPE.DATE,
+    "revenue": FIELD_TYPE.NEWDECIMAL,
+    "profit": FIELD_TYPE.NEWDECIMAL,
+    "payment_status": FIELD_TYPE.VAR_STRING,
+}
+
+
+def _chunk(rows):
+    frame = pd.DataFrame(rows, columns=list(COLUMN_TYPES))
+    frame.attrs["column_types"] = COLUMN_TYPES
+    return frame
+
+
+def test_parquet_schema_comes_from_column_types(tmp_path):
+    # Later chunk has wider DECIMALs and values in columns that were all NULL
+    chunks = [
+        _chunk([(1, datetime.date(2024, 1, 5), Decimal("1.50"), None, None)]),
+        _chunk([(2, None, Decimal("12345.75"), Decimal("-3.25"), "Pending")]),
+    ]
+    path = tmp_path / "sales.parquet"
+    _write_parquet(iter(chunks), str(path))
+
+    table = pq.read_table(path)
+    assert table.num_rows == 2
+    assert str(table.schema.field("revenue").type) == "double"
+    assert str(table.schema.field("sales_date").type) == "date32[day]"
+    assert table.column("profit").to_pylist() == [None, -3.25]
+    assert table.column("payment_status").to_pylist() == [None, "Pending"]
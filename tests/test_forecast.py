@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from forecast import PLAN_COLUMNS, reorder_plan  # noqa: E402
+
+
+def test_reorder_plan_without_products():
+    sales = pd.DataFrame({'product_id': [], 'quantity_sold': [], 'sales_date': []})
+    plan = reorder_plan(sales, pd.Series(dtype=float))
+
+    assert plan.empty
+    assert list(plan.columns) == PLAN_COLUMNS
+    assert plan[plan['reorder_now']].empty
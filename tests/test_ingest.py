@@ -0,0 +1,156 @@
+import datetime
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ingest import (  # noqa: E402
+    insert_frame, iter_csv_chunks, iter_excel_chunks, upsert_frame, validate_frame
+)
+
+
+class FakeCursor:
+    """Just enough of a MySQL cursor: serves stored rows for the diff,
+    enforces the sales_keys primary key and logs every write."""
+
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._result = []
+
+    def execute(self, statement, params=None):
+        if "information_schema.TABLES" in statement:
+            self._result = [(1,)] if params[0] in self.db["tables"] else []
+        elif statement.lstrip().startswith("SELECT"):
+            self._result = [row for row in self.db["rows"] if str(row[0]) in map(str, params)]
+        else:
+            self.executemany(statement, [params])
+
+    def executemany(self, statement, rows):
+        if statement.startswith("INSERT INTO sales_keys"):
+            for (sale_id,) in rows:
+                if sale_id in self.db["sales_keys"]:
+                    raise ValueError(f"Duplicate entry '{sale_id}' for key 'PRIMARY'")
+                self.db["sales_keys"].add(sale_id)
+        self.db["log"].append((statement.split()[0], statement, rows))
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows=(), tables=(), sales_keys=()):
+        self.db = {"rows": list(rows), "tables": set(tables), "sales_keys": set(sales_keys), "log": []}
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def deletes(self):
+        return [rows[0] for verb, _, rows in self.db["log"] if verb == "DELETE"]
+
+
+def _sales(rows):
+    frame = pd.DataFrame(rows, columns=["sale_id", "product_id", "selling_price", "quantity_sold",
+                                        "sales_date", "shipped_status", "payment_status"])
+    clean, _ = validate_frame(frame, "sales")
+    return clean
+
+
+STORED = [
+    (1, "P1", 10.0, 1, datetime.date(2024, 1, 5), "Yes", "Paid"),
+    (2, "P1", 10.0, 1, datetime.date(2024, 1, 5), "Yes", "Paid"),
+]
+
+
+def test_upsert_deletes_only_rows_whose_partition_date_moved():
+    conn = FakeConnection(rows=STORED, tables={"sales_keys"}, sales_keys={1, 2})
+    counts = upsert_frame(conn, "sales", _sales([
+        [1, "P1", 12.0, 1, "2024-01-05", "Yes", "Paid"],  # price corrected
+        [2, "P1", 10.0, 1, "2024-02-05", "Yes", "Paid"],  # moved to February
+        [3, "P1", 10.0, 1, "2024-02-05", "Yes", "Paid"],  # new sale
+    ]))
+
+    assert counts["inserted"] == 1 and counts["updated"] == 2
+    assert conn.deletes() == [[2]]
+    assert conn.db["sales_keys"] == {1, 2, 3}
+
+
+def test_upsert_of_unpartitioned_table_never_deletes():
+    conn = FakeConnection(rows=[("P1", "Widget", "Tools", 5)])
+    frame = pd.DataFrame([["P1", "Widget", "Hardware", 5]],
+                         columns=["product_id", "product_name", "category", "stock"])
+    counts = upsert_frame(conn, "product", frame)
+
+    assert counts["updated"] == 1
+    assert conn.deletes() == []
+
+
+def test_append_rejects_a_sale_id_already_taken():
+    conn = FakeConnection(tables={"sales_keys"}, sales_keys={1})
+    inserted, errors = insert_frame(conn, "sales", _sales([
+        [1, "P1", 10.0, 1, "2024-03-01", "Yes", "Paid"],
+        [4, "P1", 10.0, 1, "2024-03-01", "Yes", "Paid"],
+    ]))
+
+    assert inserted == 1
+    assert [index for index, _ in errors] == [0]
+    assert "Duplicate entry" in errors[0][1]
+
+
+def test_sales_csv_with_a_blank_product_id_keeps_the_other_ids():
+    csv = io.StringIO(
+        "sale_id,product_id,selling_price,quantity_sold,sales_date,shipped_status,payment_status\n"
+        "1,1001,10,1,2024-01-05,Shipped,Received\n"
+        "2,,10,1,2024-01-05,Shipped,Received\n"
+        "3,007,10,1,2024-01-05,Shipped,Received\n"
+    )
+    chunk = next(iter_csv_chunks(csv, table="sales"))
+    clean, rejects = validate_frame(chunk, "sales", product_ids={"1001", "007"})
+
+    assert clean["product_id"].tolist() == ["1001", "007"]
+    assert rejects["reason"].tolist() == ["product_id is required"]
+
+
+def test_excel_numeric_product_ids_are_read_as_text():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["product_id", "product_name", "category", "stock"])
+    sheet.append([1001, "Widget", "Tools", 5])
+    sheet.append([None, "Gadget", "Tools", 5])
+    sheet.append(["007", "Gizmo", "Tools", 5])
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+
+    chunk = next(iter_excel_chunks(file, "product"))
+    ids = chunk["product_id"]
+    assert ids[ids.notna()].tolist() == ["1001", "007"] and ids.isna().iloc[1]
+
+
+def test_workbook_without_a_matching_sheet_names_the_missing_columns():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Supplier"
+    sheet.append(["product_id", "product_name", "category", "vendor", "order_date",
+                  "quantity_purchased", "cost_price", "payment_due_date", "payment_status"])
+    sheet.append(["P1", "Widget", "Tools", "Acme", "2024-01-05", 1, 10, None, "Pending"])
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+
+    with pytest.raises(ValueError, match="'Supplier' lacks vendor_name"):
+        list(iter_excel_chunks(file, "purchases"))
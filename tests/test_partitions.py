@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from partitions import add_future_partitions  # noqa: E402
+
+
+class PlainTableCursor:
+    """information_schema reports no partitions, as for a table `init` never touched."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+
+    def fetchall(self):
+        return []
+
+
+def test_maintain_on_an_unpartitioned_table_asks_for_init():
+    cursor = PlainTableCursor()
+    with pytest.raises(ValueError, match="partitions.py init"):
+        add_future_partitions(cursor, "sales")
+    assert not any("REORGANIZE" in statement for statement in cursor.statements)
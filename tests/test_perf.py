@@ -0,0 +1,30 @@
+import sys
+import tracemalloc
+from pathlib import Path
+
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import perf  # noqa: E402
+
+
+def test_overlapping_runs_share_the_memory_tracer():
+    st.session_state["perf_panel"] = True
+    first, second = perf.page_timer("Home"), perf.page_timer("Sales")
+    data = [bytes(1024) for _ in range(1000)]
+
+    first.finish()
+    # The other run is still going, so its peak must still be traced
+    assert tracemalloc.is_tracing()
+    assert second.finish()["peak_memory_bytes"] >= 1024 * 1000
+    assert not tracemalloc.is_tracing()
+    del data
+
+
+def test_run_that_never_finishes_releases_the_tracer():
+    st.session_state["perf_panel"] = True
+    timer = perf.page_timer("Inventory")
+    assert tracemalloc.is_tracing()
+    del timer
+    assert not tracemalloc.is_tracing()